@@ -28,7 +28,20 @@ bl_info = {
 if not bpy.app.background:
     from .node_pie import npie_btypes
 
-    npie_btypes.configure("node_pie", auto_register=True)
+    npie_btypes.configure(
+        "node_pie",
+        auto_register=True,
+        # These are only needed when drawing, from the command line or by the developer tools, so don't slow down
+        # startup. The operators of the developer tools are still registered, so that they can be shown in menus,
+        # but they only import these modules when they are run.
+        lazy_modules={
+            "node_pie.npie_drawing",
+            "node_pie.npie_cli",
+            "node_pie.npie_merge_popularity",
+            "node_pie.npie_generate_socket_types",
+            "node_pie.npie_node_availability",
+        },
+    )
 
     def register():
         npie_btypes.register()
@@ -0,0 +1,4 @@
+"""The parts of node pie that are plain data processing, and so don't depend on Blender.
+Nothing in this package may import bpy, so that it can be used from the command line, worker processes,
+and benchmarked or tested with a normal python interpreter.
+The modules outside of this package adapt it to the Blender api."""
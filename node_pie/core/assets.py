@@ -0,0 +1,130 @@
+"""An index of the node group assets in asset libraries, which is stored on disk between sessions.
+Reading the assets from a .blend file is slow, so files are only read again when their modification time or size changes."""
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+
+ASSET_INDEX_VERSION = 1
+CATALOG_FILE = "blender_assets.cats.txt"
+
+
+def get_asset_popularity_id(path: str, name: str) -> str:
+    return f"asset:{path}:{name}"
+
+
+@dataclass(slots=True, frozen=True)
+class AssetEntry:
+    name: str
+    tree_type: str
+    # The path of the catalog, e.g. "Studio/Shading", or empty if the asset isn't in a catalog
+    catalog: str
+    # The .blend file containing the asset
+    path: str
+
+    @property
+    def popularity_id(self) -> str:
+        return get_asset_popularity_id(self.path, self.name)
+
+
+def read_catalogs(library_dir: Path) -> dict[str, str]:
+    """Get the path of each catalog in an asset library, indexed by its uuid.
+    The catalog file has a line for each catalog in the format `uuid:catalog/path:simple name`"""
+    catalogs = {}
+    path = library_dir / CATALOG_FILE
+    if not path.exists():
+        return catalogs
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line or line.startswith(("#", "VERSION")):
+            continue
+        parts = line.split(":")
+        if len(parts) >= 2:
+            catalogs[parts[0]] = parts[1]
+    return catalogs
+
+
+def iter_blend_files(library_dir: Path) -> Iterable[Path]:
+    """Get all of the .blend files in an asset library, ignoring hidden directories"""
+    for root, dirs, files in os.walk(library_dir):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for file in files:
+            if file.endswith(".blend"):
+                yield Path(root) / file
+
+
+class AssetIndex:
+    """The node group assets in each .blend file, along with the modification time and size it was read at"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.files: dict[str, tuple[int, int, list[AssetEntry]]] = {}
+        self.loaded = False
+        self.dirty = False
+        # Incremented whenever the assets change, so that other caches know when to update
+        self.generation = 0
+        # The assets for each tree type, rebuilt when the files change
+        self._by_tree_type: dict[str, list[AssetEntry]] | None = None
+
+    def load(self):
+        self.loaded = True
+        self.files = {}
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text())
+        except json.JSONDecodeError:
+            return
+        if data.get("version") != ASSET_INDEX_VERSION:
+            return
+        for file, (mtime, size, assets) in data.get("files", {}).items():
+            self.files[file] = (mtime, size, [AssetEntry(**asset) for asset in assets])
+        self.tag_changed()
+        self.dirty = False
+
+    def save(self):
+        files = {file: (mtime, size, [asdict(a) for a in assets]) for file, (mtime, size, assets) in self.files.items()}
+        self.path.write_text(json.dumps({"version": ASSET_INDEX_VERSION, "files": files}))
+        self.dirty = False
+
+    def iter_stale_files(self, files: Iterable[Path]) -> Iterator[tuple[Path, os.stat_result | None]]:
+        """Check each of the given files, yielding its stat if it has been added or changed since it was last read,
+        or None if it hasn't, so that the caller can pause between files when checking a large library.
+        Once all files have been checked, the files that no longer exist are removed from the index."""
+        found = set()
+        for file in files:
+            try:
+                stat = file.stat()
+            except OSError:
+                continue
+            found.add(str(file))
+            cached = self.files.get(str(file))
+            if not cached or cached[0] != stat.st_mtime_ns or cached[1] != stat.st_size:
+                yield file, stat
+            else:
+                yield file, None
+
+        if removed := self.files.keys() - found:
+            for file in removed:
+                del self.files[file]
+            self.tag_changed()
+
+    def update_file(self, file: Path, stat: os.stat_result, assets: list[AssetEntry]):
+        self.files[str(file)] = (stat.st_mtime_ns, stat.st_size, assets)
+        self.tag_changed()
+
+    def tag_changed(self):
+        self._by_tree_type = None
+        self.generation += 1
+        self.dirty = True
+
+    def get_assets(self, tree_type: str) -> list[AssetEntry]:
+        """Get all of the node group assets for the given node tree type"""
+        if self._by_tree_type is None:
+            by_tree_type = {}
+            for _, _, assets in self.files.values():
+                for asset in assets:
+                    by_tree_type.setdefault(asset.tree_type, []).append(asset)
+            self._by_tree_type = by_tree_type
+        return self._by_tree_type.get(tree_type, [])
@@ -0,0 +1,179 @@
+"""An index of the definition files, containing the metadata needed to decide which files to load, and in what order.
+It is built once, and then only the directories and files that have changed are rescanned,
+so that choosing the files for a node tree doesn't require reading and parsing all of them."""
+
+import json
+import os
+from dataclasses import dataclass
+from hashlib import sha1
+from pathlib import Path
+
+from .jsonc import JSONWithCommentsDecoder
+
+
+@dataclass(slots=True, frozen=True)
+class DefFileEntry:
+    """The metadata of a single definition file"""
+
+    path: Path
+    # The tree type of the file, e.g. 'GeometryNodeTree_4_2.jsonc' -> 'GeometryNodeTree'
+    tree_type: str
+    is_user: bool
+    blender_version: tuple[int, ...]
+    render_engine: str
+    apply_after: bool
+    enable: bool
+    reset_all: bool
+    reset_layout: bool
+    imports: tuple[str, ...]
+    mtime: int
+    size: int
+    hash: str
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    @property
+    def stem(self) -> str:
+        return self.path.stem
+
+    @property
+    def sort_key(self) -> tuple[int, ...]:
+        """Files are applied from the earliest to latest blender version"""
+        # TODO: REMOVE
+        if self.apply_after:
+            return (9, 9, 9)
+        return self.blender_version
+
+    @classmethod
+    def from_file(cls, path: Path, stat: os.stat_result, user_dir: Path = None):
+        text = path.read_text()
+        data = json.loads(text, cls=JSONWithCommentsDecoder)
+        return cls(
+            path=path,
+            tree_type=path.stem.split("_")[0],
+            is_user=user_dir in path.parents,
+            blender_version=tuple(data.get("blender_version", [0, 0, 0])),
+            render_engine=data.get("render_engine", ""),
+            apply_after=data.get("apply_after", False),
+            enable=data.get("enable", True),
+            reset_all=data.get("reset_all", False),
+            reset_layout=data.get("reset_layout", False),
+            imports=tuple(data.get("imports", ())),
+            mtime=stat.st_mtime_ns,
+            size=stat.st_size,
+            hash=sha1(text.encode()).hexdigest(),
+        )
+
+
+class DefFileIndex:
+    """An incrementally updated index of all definition files in a directory.
+    Files in `builtin_dir` are replaced by files with the same name in `user_dir`"""
+
+    def __init__(self, root: Path, builtin_dir: Path, user_dir: Path, ignore_prefix: str = ""):
+        self.root = root
+        self.builtin_dir = builtin_dir
+        self.user_dir = user_dir
+        self.ignore_prefix = ignore_prefix
+        # The modification time of each directory, and the definition files directly inside it
+        self.dirs: dict[Path, tuple[int, list[Path]]] = {}
+        self.entries: dict[Path, DefFileEntry] = {}
+        # Files that couldn't be read, with the modification time and size they had and the reason they failed.
+        # These are kept separate so that a broken file only affects the node tree that it belongs to.
+        self.errors: dict[Path, tuple[int, int, str]] = {}
+        # The paths of all definition files, including the ones that couldn't be read, in the order they were found
+        self.paths: list[Path] = []
+
+    def scan_dir(self, directory: Path) -> list[Path]:
+        """Get the definition files in a directory, only listing its contents if it has changed"""
+        mtime = directory.stat().st_mtime_ns
+        if (cached := self.dirs.get(directory)) and cached[0] == mtime:
+            files = cached[1]
+            sub_dirs = [d for d in self.dirs if d.parent == directory]
+        else:
+            files, sub_dirs = [], []
+            with os.scandir(directory) as it:
+                for item in it:
+                    path = Path(item.path)
+                    if item.is_dir():
+                        # Socket files are loaded separately
+                        if item.name != "sockets":
+                            sub_dirs.append(path)
+                    elif path.suffix == ".jsonc" and not (self.ignore_prefix and path.name.startswith(self.ignore_prefix)):
+                        files.append(path)
+            files.sort()
+            # Remove directories that no longer exist
+            for path in [d for d in self.dirs if d.parent == directory and d not in sub_dirs]:
+                del self.dirs[path]
+            self.dirs[directory] = (mtime, files)
+
+        for sub_dir in sorted(sub_dirs):
+            files = files + self.scan_dir(sub_dir)
+        return files
+
+    def refresh(self):
+        """Update the index with any files that have been added, removed or changed since the last refresh"""
+        entries = {}
+        errors = {}
+        paths = []
+        for path in self.scan_dir(self.root):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            paths.append(path)
+
+            # Don't try to read a broken file again until it has been changed
+            if (error := self.errors.get(path)) and error[:2] == (stat.st_mtime_ns, stat.st_size):
+                errors[path] = error
+                continue
+
+            entry = self.entries.get(path)
+            if not entry or entry.mtime != stat.st_mtime_ns or entry.size != stat.st_size:
+                try:
+                    entry = DefFileEntry.from_file(path, stat, self.user_dir)
+                except (OSError, UnicodeDecodeError, ValueError, TypeError, AttributeError) as e:
+                    errors[path] = (stat.st_mtime_ns, stat.st_size, str(e))
+                    continue
+            entries[path] = entry
+        self.entries = entries
+        self.errors = errors
+        self.paths = paths
+
+    def get_all_files(self) -> list[DefFileEntry]:
+        return list(self.entries.values())
+
+    def get_all_paths(self) -> list[Path]:
+        """Get the paths of all definition files, including any that couldn't be read"""
+        return list(self.paths)
+
+    def get_tree_errors(self, tree_identifier: str) -> list[str]:
+        """Get a description of each definition file for the given node tree that couldn't be read"""
+        errors = self.errors.items()
+        return [f"{path.name}: {error[2]}" for path, error in errors if path.name.startswith(tree_identifier)]
+
+    def get_render_engine_file(self, render_engine: str) -> DefFileEntry | None:
+        """Get the file for shader nodes that is specific to the given render engine"""
+        for entry in self.entries.values():
+            if entry.render_engine == render_engine:
+                return entry
+        return None
+
+    def get_tree_files(self, tree_identifier: str) -> list[DefFileEntry]:
+        """Get the files for the given node tree, in the order they should be applied.
+        User files replace builtin files with the same name."""
+        user = [e for e in self.entries.values() if e.is_user and e.name.startswith(tree_identifier)]
+        names = {e.name for e in user}
+        builtin = [
+            e
+            for e in self.entries.values()
+            if self.builtin_dir in e.path.parents and e.name.startswith(tree_identifier) and e.name not in names
+        ]
+        return sorted(user + builtin, key=lambda e: e.sort_key)
+
+    def get_import(self, name: str) -> DefFileEntry | None:
+        for entry in self.entries.values():
+            if entry.stem == name:
+                return entry
+        return None
@@ -0,0 +1,200 @@
+"""Merging the definition files of a node tree into a single definition"""
+
+import copy
+import json
+
+from .def_files import DefFileEntry, DefFileIndex
+from .jsonc import JSONWithCommentsDecoder
+from .timings import timings
+
+
+def create_defaults(data: dict):
+    # Add default values in case they are missing from the file
+    default_layout = {"top": [[]], "bottom": [[]], "left": [[]], "right": [[]]}
+    data["layout"] = data.get("layout", default_layout)
+    default_layout.update(data["layout"])
+    data["layout"] = default_layout
+    data["poll_types"] = data.get("poll_types", {})
+    data["categories"] = data.get("categories", {})
+    return data
+
+
+@timings.timed("merge_configs")
+def merge_configs(base: dict, additions: dict, removals: dict = {}):
+    # Add default values in case they are missing from the file
+    base = create_defaults(base)
+    additions = create_defaults(additions)
+    removals = create_defaults(removals)
+
+    # REMOVALS
+    # Process layout removals
+    orig_layout = base["layout"]
+    remove_layout = removals["layout"]
+    for area_name, rem_area in remove_layout.items():
+        for orig_column, rem_column in zip(orig_layout[area_name], rem_area):
+            for cat_id in rem_column:
+                orig_column.remove(cat_id)
+
+    # Process category removals
+    orig_categories = base["categories"]
+    remove_categories = removals["categories"]
+    for rem_cat_name, rem_cat in remove_categories.items():
+        if nodes := rem_cat.get("nodes", []):
+            orig_nodes = orig_categories[rem_cat_name]["nodes"]
+            for rem_node in nodes:
+                for i, orig_node in enumerate(orig_nodes.copy()):
+                    if rem_node.get("separator") or orig_node.get("separator"):
+                        continue
+                    if rem_node["identifier"] == orig_node["identifier"]:
+                        orig_nodes.remove(orig_node)
+                        break
+            pass
+        else:
+            del orig_categories[rem_cat_name]
+
+    # Process full node removals
+    remove_nodes = removals.get("nodes", [])
+    for rem_node in remove_nodes:
+        for orig_category in orig_categories.values():
+            for orig_node in orig_category["nodes"].copy():
+                if rem_node == orig_node.get("identifier"):
+                    orig_category["nodes"].remove(orig_node)
+                    break
+
+    # ADDITIONS
+    # Merge layout
+    for orig_area_name, orig_columns in base["layout"].items():
+        new_columns = additions["layout"].get(orig_area_name)
+        if not new_columns:
+            continue
+        for i, new_column in enumerate(new_columns):
+            new_column = new_column.copy()
+            for new_row in new_column:
+                orig_columns = base["layout"][orig_area_name]
+                if i > len(orig_columns) - 1:
+                    orig_columns.append([new_row])
+                else:
+                    orig_columns[i].append(new_row)
+
+    # Merge poll types
+    poll_types: dict = base["poll_types"]
+    poll_types.update(additions["poll_types"])
+
+    # Merge in the new nodes
+    for orig_cat_name, orig_cat in base["categories"].items():
+        new_cat = additions["categories"].get(orig_cat_name)
+        if new_cat:
+            # Insert the node after the specified one.
+            idx = -1
+            for new_node in new_cat["nodes"]:
+                if name := new_node.get("after_node"):
+                    if name == "top":
+                        idx = 0
+                    elif name == "bottom":
+                        idx = -1
+                    else:
+                        names = [n.get("identifier") for n in orig_cat["nodes"]]
+                        idx = names.index(name) + 1
+                elif name := new_node.get("before_node"):
+                    names = [n.get("identifier") for n in orig_cat["nodes"]]
+                    idx = names.index(name)
+
+                if idx == -1:
+                    orig_cat["nodes"].append(new_node)
+                else:
+                    orig_cat["nodes"].insert(idx, new_node)
+
+    # Add new categories
+    new_cats = additions["categories"].keys() - base["categories"].keys()
+    for new_cat in new_cats:
+        base["categories"][new_cat] = additions["categories"][new_cat]
+    return base
+
+
+# Snapshots of the merged definition data for each tree type, keyed by the hashes of the files merged to produce them.
+# These are never modified, only copied, so that a change to a user file only needs that file and the ones after it
+# to be merged again, rather than the whole chain.
+merge_checkpoints: dict[str, dict[tuple[str, ...], dict]] = {}
+
+
+def apply_def_file(data: dict, entry: DefFileEntry):
+    """Merge the additions and removals of a definition file into the data"""
+    with open(entry.path, "r") as f:
+        new_data = json.load(f, cls=JSONWithCommentsDecoder)
+
+    # check for resetting
+    # Happens if there is a major change to nodes in an update
+    reset_all = new_data.get("reset_all", False)
+    if new_data.get("reset_layout", False) or reset_all:
+        data["layout"] = {"left": [], "right": [], "top": [], "bottom": []}
+    if reset_all:
+        data["categories"] = {}
+
+    merge_configs(data, new_data.get("additions", {}), new_data.get("removals", {}))
+
+
+def get_imports(index: DefFileIndex, base: DefFileEntry) -> list[DefFileEntry]:
+    """Get the files imported by the given base file"""
+    imports = []
+    for import_name in base.imports:
+        if not (entry := index.get_import(import_name)):
+            raise ValueError(f"file {import_name}.jsonc not found")
+        imports.append(entry)
+    return imports
+
+
+def get_merge_keys(
+    index: DefFileIndex,
+    entries: list[DefFileEntry],
+    bl_version: tuple[int, ...],
+) -> tuple[list[DefFileEntry], list[DefFileEntry], list[tuple[str, ...]]]:
+    """Get the imports of the base file, the files that are applied for the given blender version,
+    and the key of the merged state after applying each number of those files.
+    The last key changes whenever any of the files that the merged data depends on change."""
+    imports = get_imports(index, entries[0])
+
+    # Merge in nodes from newer versions
+    applied = [e for e in entries if e.blender_version <= bl_version and e.enable]
+
+    base_key = (entries[0].hash,) + tuple(e.hash for e in imports)
+    keys = [base_key + tuple(e.hash for e in applied[:i]) for i in range(len(applied) + 1)]
+    return imports, applied, keys
+
+
+def merge_def_files(
+    index: DefFileIndex,
+    tree_identifier: str,
+    entries: list[DefFileEntry],
+    bl_version: tuple[int, ...],
+) -> dict:
+    """Merge the given definition files in order, starting from the latest checkpoint that is still valid.
+    Files for blender versions newer than `bl_version` are skipped.
+    A checkpoint is stored before each user file, and after the last file."""
+    base = entries[0]
+    imports, applied, keys = get_merge_keys(index, entries, bl_version)
+
+    # Discard checkpoints from files that have changed
+    checkpoints = {k: v for k, v in merge_checkpoints.get(tree_identifier, {}).items() if k in keys}
+    merge_checkpoints[tree_identifier] = checkpoints
+
+    for start in reversed(range(len(keys))):
+        if checkpoint := checkpoints.get(keys[start]):
+            data = copy.deepcopy(checkpoint)
+            break
+    else:
+        start = 0
+        with open(base.path, "r") as f:
+            data = json.load(f, cls=JSONWithCommentsDecoder)
+        # Merge in imports
+        for entry in imports:
+            with open(entry.path, "r") as f:
+                merge_configs(data, json.load(f, cls=JSONWithCommentsDecoder))
+
+    for i in range(start, len(applied)):
+        if applied[i].is_user and keys[i] not in checkpoints:
+            checkpoints[keys[i]] = copy.deepcopy(data)
+        apply_def_file(data, applied[i])
+
+    if keys[-1] not in checkpoints:
+        checkpoints[keys[-1]] = copy.deepcopy(data)
+    return data
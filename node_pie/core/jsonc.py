@@ -0,0 +1,23 @@
+import json
+import re
+from pathlib import Path
+
+
+class JSONWithCommentsDecoder(json.JSONDecoder):
+
+    match_trailing_commas: re.Pattern = re.compile(r",(?=\s*?[\}\]])", re.MULTILINE)
+
+    def __init__(self, **kw):
+        super().__init__(**kw)
+
+    def decode(self, s: str):
+        # Remove comments
+        s = "\n".join(line if not line.lstrip().startswith("//") else "" for line in s.split("\n"))
+        # Remove trailing commas
+        s = self.match_trailing_commas.sub("", s)
+        return super().decode(s)
+
+
+def load_jsonc(path: Path):
+    """Load a JSON file that may contain comments and trailing commas"""
+    return json.loads(Path(path).read_text(), cls=JSONWithCommentsDecoder)
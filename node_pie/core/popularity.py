@@ -0,0 +1,218 @@
+"""Reading and writing the number of times each node has been added, in the formats used by the addon"""
+
+import json
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+
+POPULARITY_FILE_VERSION = (0, 0, 1)
+
+
+def get_popularity_id(node_idname, settings={}):
+    if not isinstance(settings, str):
+        settings = str(settings)
+    return node_idname + ("" if settings == "{}" else settings)
+
+
+class JSONPopularityStore:
+    """Stores the popularity of every node in a single JSON file.
+    The whole file is rewritten each time a node is added."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def load(self) -> dict:
+        if not self.path.exists():
+            return {"node_trees": {}}
+        with open(self.path, "r") as f:
+            try:
+                data = json.load(f)
+            except json.decoder.JSONDecodeError:
+                data = {"node_trees": {}}
+        return data
+
+    def get_version(self):
+        """A value that changes whenever the stored counts change, including from other Blender instances"""
+        return self.path.stat().st_mtime_ns if self.path.exists() else None
+
+    def get_counts(self, tree_type: str) -> dict[str, int]:
+        """Get the number of times each node has been added to the given node tree type"""
+        nodes = self.load().get("node_trees", {}).get(tree_type, {})
+        return {node_id: node.get("count", 0) for node_id, node in nodes.items()}
+
+    def increment(self, tree_type: str, node_id: str):
+        """Increase the popularity of the given node by 1"""
+        data = self.load()
+        version = data.get("version", POPULARITY_FILE_VERSION)
+
+        if version[0] > POPULARITY_FILE_VERSION[0]:
+            raise ValueError("Saved nodes file is from a newer version of the addon")
+
+        trees = data.get("node_trees", {})
+        nodes = OrderedDict(trees.get(tree_type, {}))
+        node = nodes.get(node_id, {})
+        node["count"] = node.get("count", 0) + 1
+        nodes[node_id] = node
+
+        data["version"] = POPULARITY_FILE_VERSION
+        # Sort the nodes in descending order
+        nodes = OrderedDict(sorted(nodes.items(), key=lambda item: item[1].get("count", 0), reverse=True))
+        trees[tree_type] = nodes
+        data["node_trees"] = trees
+
+        with open(self.path, "w") as f:
+            json.dump(data, f, indent=4)
+
+    def reset(self):
+        with open(self.path, "w"):
+            pass
+
+
+class SQLitePopularityStore:
+    """Stores the popularity of each node as a row in an SQLite database.
+    The database uses write-ahead logging, and counts are incremented in a single statement,
+    so that several Blender instances can add nodes at the same time without losing any changes.
+    Any existing JSON popularity data is imported the first time the database is used."""
+
+    def __init__(self, path: Path, json_store: JSONPopularityStore):
+        self.path = path
+        # The store to import existing counts from
+        self.json_store = json_store
+        self._connection: sqlite3.Connection | None = None
+        # data_version only changes when other connections modify the database, so keep track of local changes too
+        self.generation = 0
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection:
+            return self._connection
+
+        # Autocommit mode, so that each statement is its own transaction unless one is started explicitly
+        connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS popularity (
+                tree_type TEXT NOT NULL,
+                node_id TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (tree_type, node_id)
+            );
+            CREATE INDEX IF NOT EXISTS popularity_by_count ON popularity (tree_type, count DESC);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+        # Only keep the connection once the migration has succeeded, so that a failed migration is tried again
+        try:
+            self.migrate_json(connection)
+        except Exception:
+            connection.close()
+            raise
+        self._connection = connection
+        return connection
+
+    def migrate_json(self, connection: sqlite3.Connection):
+        """Import the counts from the JSON popularity file, if that hasn't already been done"""
+        # Take the write lock first, so that only one instance can do the migration
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if connection.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+                connection.execute("COMMIT")
+                return
+
+            data = self.json_store.load()
+            trees = data.get("node_trees", {}) if isinstance(data, dict) else {}
+            for tree_type, nodes in trees.items() if isinstance(trees, dict) else ():
+                if not isinstance(nodes, dict):
+                    continue
+                # Skip invalid entries in the same way as when reading popularity files
+                rows = []
+                for node_id, node in nodes.items():
+                    count = node.get("count", 0) if isinstance(node, dict) else 0
+                    if isinstance(count, int) and not isinstance(count, bool) and count > 0:
+                        rows.append((tree_type, node_id, count))
+                connection.executemany(
+                    """INSERT INTO popularity (tree_type, node_id, count) VALUES (?, ?, ?)
+                    ON CONFLICT (tree_type, node_id) DO UPDATE SET count = count + excluded.count""",
+                    rows,
+                )
+            connection.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', '1')")
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def get_version(self):
+        """A value that changes whenever the stored counts change, including from other Blender instances"""
+        return self.connection.execute("PRAGMA data_version").fetchone()[0], self.generation
+
+    def get_counts(self, tree_type: str) -> dict[str, int]:
+        """Get the number of times each node has been added to the given node tree type, most used first"""
+        rows = self.connection.execute(
+            "SELECT node_id, count FROM popularity WHERE tree_type = ? ORDER BY count DESC",
+            (tree_type,),
+        )
+        return dict(rows.fetchall())
+
+    def increment(self, tree_type: str, node_id: str):
+        """Increase the popularity of the given node by 1"""
+        self.connection.execute(
+            """INSERT INTO popularity (tree_type, node_id, count) VALUES (?, ?, 1)
+            ON CONFLICT (tree_type, node_id) DO UPDATE SET count = count + 1""",
+            (tree_type, node_id),
+        )
+        self.generation += 1
+
+    def reset(self):
+        # The migration flag is kept, so that the old JSON counts aren't imported again
+        self.connection.execute("DELETE FROM popularity")
+        self.generation += 1
+
+    def close(self):
+        if self._connection:
+            self._connection.close()
+            self._connection = None
+
+
+def read_counts(path: Path) -> dict[str, dict[str, int]]:
+    """Read the node counts from a popularity file. Raises ValueError if the file isn't valid."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(str(e)) from e
+
+    if not isinstance(data, dict) or not isinstance(data.get("node_trees", {}), dict):
+        raise ValueError("Not a popularity file")
+    version = data.get("version", POPULARITY_FILE_VERSION)
+    if (
+        not isinstance(version, list | tuple)
+        or not version
+        or not all(isinstance(v, int) and not isinstance(v, bool) for v in version)
+        or version[0] > POPULARITY_FILE_VERSION[0]
+    ):
+        raise ValueError(f"Unsupported version {version}")
+
+    counts = {}
+    for tree_type, nodes in data.get("node_trees", {}).items():
+        if not isinstance(nodes, dict):
+            raise ValueError(f"Invalid nodes for {tree_type}")
+        tree_counts = {}
+        for node_id, node in nodes.items():
+            count = node.get("count", 0) if isinstance(node, dict) else 0
+            # bool is a subclass of int, but true isn't a valid count
+            if isinstance(count, int) and not isinstance(count, bool) and count > 0:
+                tree_counts[node_id] = count
+        counts[tree_type] = tree_counts
+    return counts
+
+
+def layer_counts(local: dict[str, int], baseline: dict[str, int]) -> dict[str, float]:
+    """Combine local and baseline counts, so that the baseline only decides the order of nodes with equal local counts.
+    This means a new install uses the studio order, while nodes the user adds become more popular as normal."""
+    if not baseline:
+        return dict(local)
+    max_baseline = max(baseline.values()) + 1
+    counts = {node_id: count + baseline.get(node_id, 0) / max_baseline for node_id, count in local.items()}
+    for node_id, count in baseline.items():
+        counts.setdefault(node_id, count / max_baseline)
+    return counts
@@ -0,0 +1,55 @@
+"""The nodes that have been added most recently in each node tree type.
+Unlike the popularity counts, this only ever holds a fixed number of nodes, so it stays small and quick to update."""
+
+import json
+from collections import OrderedDict
+from itertools import islice
+from pathlib import Path
+
+# A node is identified by its idname, its settings as a string, and the name of its node group if it has one
+RecentNode = tuple[str, str, str]
+
+
+class RecentNodes:
+    """The most recently added nodes for each node tree type.
+    Each tree type holds at most `capacity` nodes, with the oldest being dropped when a new one is added.
+    Adding a node that is already present moves it to the front rather than adding it twice."""
+
+    def __init__(self, path: Path, capacity: int = 32):
+        self.path = path
+        self.capacity = capacity
+        # Ordered from oldest to newest. Loaded the first time it is needed, and only written after that.
+        self._trees: dict[str, OrderedDict[RecentNode, None]] | None = None
+
+    @property
+    def trees(self) -> dict[str, OrderedDict[RecentNode, None]]:
+        if self._trees is None:
+            self._trees = {}
+            try:
+                data = json.loads(self.path.read_text())
+                for tree_type, nodes in data.get("node_trees", {}).items():
+                    self._trees[tree_type] = OrderedDict((tuple(node), None) for node in nodes[-self.capacity :])
+            except (OSError, json.JSONDecodeError, TypeError, AttributeError):
+                pass
+        return self._trees
+
+    def add(self, tree_type: str, idname: str, settings: str = "{}", group_name: str = ""):
+        nodes = self.trees.setdefault(tree_type, OrderedDict())
+        node = (idname, settings, group_name)
+        nodes[node] = None
+        nodes.move_to_end(node)
+        if len(nodes) > self.capacity:
+            nodes.popitem(last=False)
+        self.save()
+
+    def get_recent(self, tree_type: str, count: int) -> list[RecentNode]:
+        """Get up to `count` of the most recently added nodes, newest first"""
+        return list(islice(reversed(self.trees.get(tree_type, {}).keys()), count))
+
+    def save(self):
+        data = {"node_trees": {tree_type: list(nodes) for tree_type, nodes in self.trees.items()}}
+        self.path.write_text(json.dumps(data, separators=(",", ":")))
+
+    def reset(self):
+        self._trees = {}
+        self.save()
@@ -0,0 +1,134 @@
+"""Fuzzy search of the items that can be added from the pie.
+Each word of every label is indexed by its first two characters and by its trigrams,
+so that a keystroke only needs a few set operations rather than comparing the query against every label.
+Short query words have to be the start of a word. Longer ones only need to share most of their trigrams with a word,
+so that they still match with a typo in them, which can change up to three trigrams."""
+
+import re
+from dataclasses import dataclass, field
+from heapq import merge, nsmallest
+from itertools import islice
+from typing import Any, Callable
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+# The number of characters of each word that are indexed as prefixes. Shorter query words are looked up by prefix.
+PREFIX_LENGTH = 2
+# The number of trigrams of a query word that can be missing from a word, as long as at least half of them are found
+MAX_MISSING_TRIGRAMS = 3
+
+
+def split_words(text: str) -> list[str]:
+    return WORD_RE.findall(text.lower())
+
+
+def get_trigrams(word: str) -> set[str]:
+    return {word[i : i + 3] for i in range(len(word) - 2)}
+
+
+@dataclass(slots=True, frozen=True)
+class SearchEntry:
+    """Something that can be found by searching"""
+
+    # The text that is both searched and shown in the results. This should be unique.
+    label: str
+    idname: str
+    settings: dict = field(default_factory=dict)
+    # Shown next to the label, e.g. the category
+    description: str = ""
+    # The key used to look up how popular this entry is
+    popularity_id: str = ""
+    group_name: str = ""
+    is_operator: bool = False
+    # The object this entry was created from, e.g. a NodeItem
+    item: Any = field(default=None, compare=False, repr=False)
+
+
+class SearchIndex:
+    """An index of search entries by the prefixes and trigrams of the words in their labels"""
+
+    def __init__(self, entries: list[SearchEntry]):
+        self.entries = entries
+        self.labels = [entry.label.lower() for entry in entries]
+        self.by_label = {}
+        self.prefixes: dict[str, set[int]] = {}
+        self.trigrams: dict[str, set[int]] = {}
+        for i, entry in enumerate(entries):
+            self.by_label.setdefault(entry.label, entry)
+            for word in split_words(entry.label):
+                for length in range(1, min(len(word), PREFIX_LENGTH) + 1):
+                    self.prefixes.setdefault(word[:length], set()).add(i)
+                for trigram in get_trigrams(word):
+                    self.trigrams.setdefault(trigram, set()).add(i)
+        # The matches for each query word. While typing, only the word being typed needs to be looked up again.
+        self._word_matches: dict[str, frozenset[int]] = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def match_word(self, word: str) -> frozenset[int]:
+        """Get the entries with a word that matches the given query word"""
+        if (matches := self._word_matches.get(word)) is not None:
+            return matches
+
+        if len(word) <= PREFIX_LENGTH:
+            matches = frozenset(self.prefixes.get(word, ()))
+        else:
+            # A typo changes up to three trigrams, e.g. 'positon' only shares 'pos', 'osi' and 'sit' with 'position'
+            trigrams = get_trigrams(word)
+            required = max(len(trigrams) - MAX_MISSING_TRIGRAMS, (len(trigrams) + 1) // 2)
+            hits: dict[int, int] = {}
+            for trigram in trigrams:
+                for i in self.trigrams.get(trigram, ()):
+                    hits[i] = hits.get(i, 0) + 1
+            matches = frozenset(i for i, count in hits.items() if count >= required)
+
+        if len(self._word_matches) > 256:
+            self._word_matches.clear()
+        self._word_matches[word] = matches
+        return matches
+
+    def rank(self, query: str, popularity: dict[str, float] = {}, limit: int = 50) -> list[tuple[tuple, SearchEntry]]:
+        """Get the best `limit` entries that match the query, along with their sort keys, with the best matches first.
+        Entries that match equally well are ordered by popularity."""
+        words = split_words(query)
+        if not words:
+            return []
+        matches = self.match_word(words[0])
+        for word in words[1:]:
+            matches = matches & self.match_word(word)
+
+        query = " ".join(words)
+
+        def sort_key(i: int):
+            label = self.labels[i]
+            if label.startswith(query):
+                quality = 0
+            elif query in label:
+                quality = 1
+            elif all(f" {word}" in f" {label}" for word in words):
+                quality = 2
+            else:
+                quality = 3
+            return quality, -popularity.get(self.entries[i].popularity_id, 0), len(label)
+
+        # The index is included so that entries with the same key are never compared
+        best = nsmallest(limit, ((sort_key(i), i) for i in matches))
+        return [(key, self.entries[i]) for key, i in best]
+
+    def get_entry(self, label: str) -> SearchEntry | None:
+        """Get the entry with the given label, e.g. once it has been chosen from the results"""
+        return self.by_label.get(label)
+
+
+def search(
+    indices: list[SearchIndex],
+    query: str,
+    popularity: dict[str, float] = {},
+    filter: Callable[[SearchEntry], bool] = None,
+    limit: int = 50,
+) -> list[SearchEntry]:
+    """Search several indices at once, returning the best matches from all of them"""
+    # Fetch more than needed from each index, as some results may be filtered out
+    ranked = merge(*(index.rank(query, popularity, limit * 2) for index in indices), key=lambda r: r[0])
+    entries = (entry for _, entry in ranked if not filter or filter(entry))
+    return list(islice(entries, limit))
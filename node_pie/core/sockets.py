@@ -0,0 +1,112 @@
+"""Deciding which node sockets can be connected to each other.
+The socket type tables depend on the Blender version, so are passed in from `npie_node_info`."""
+
+import json
+from pathlib import Path
+
+from .jsonc import JSONWithCommentsDecoder
+
+EXCLUSIVE_SOCKETS = {"Material", "Object", "Collection", "Geometry", "Shader", "String", "Image", "Texture"}
+EXCLUSIVE_SOCKETS = {"NodeSocket" + s for s in EXCLUSIVE_SOCKETS}
+
+# Lookup tables that are filled in the first time each socket type is encountered
+socket_families: dict[tuple[int, str], str | None] = {}
+socket_scores: dict[tuple[int, str, str], int] = {}
+
+
+def get_socket_family(socket_idname: str, types: dict) -> str | None:
+    """Get the key of the given socket types dict that matches the socket idname.
+    e.g. `NodeSocketFloatFactor` -> `NodeSocketFloat`"""
+    key = (id(types), socket_idname)
+    if key not in socket_families:
+        socket_families[key] = next((s for s in types if socket_idname.startswith(s)), None)
+    return socket_families[key]
+
+
+def get_socket_compatibility(from_idname: str, to_idname: str, types: dict) -> int:
+    """Get a score for how well two socket types match, higher is better:
+    3: identical types, 2: subtypes of the same type, 1: implicitly convertible, 0: incompatible"""
+    key = (id(types), from_idname, to_idname)
+    if key not in socket_scores:
+        if from_idname == to_idname:
+            score = 3
+        elif from_idname in EXCLUSIVE_SOCKETS or to_idname in EXCLUSIVE_SOCKETS:
+            score = 0
+        else:
+            family = get_socket_family(from_idname, types)
+            score = 2 if family and family == get_socket_family(to_idname, types) else 1
+        socket_scores[key] = score
+    return socket_scores[key]
+
+
+def get_connectable_types(from_socket_type: str, types: dict) -> set[str]:
+    """Get the socket types that a socket of the given type can be connected to."""
+    if from_socket_type in EXCLUSIVE_SOCKETS:
+        return {from_socket_type}
+    return set(types.keys()) - EXCLUSIVE_SOCKETS
+
+
+def is_socket_type_valid(from_socket_type: str, from_socket_is_output: bool, node_socket_data: dict, types: dict):
+    """Check if the given socket type can be connected to any of the sockets in the given socket data."""
+    in_out = "inputs" if from_socket_is_output else "outputs"
+    valid_types = get_connectable_types(from_socket_type, types)
+    return any(t in node_socket_data[in_out] for t in valid_types)
+
+
+def load_socket_data(directory: Path, tree_type: str, max_bl_version: tuple[int, ...]) -> dict:
+    """Merge the socket files for the given node tree type, up to the given blender version.
+    Returns a dictionary of nodes and their socket types"""
+    sockets_files = directory.rglob(f"**/{tree_type}*.jsonc")
+    sockets_files_data = [json.loads(f.read_text(), cls=JSONWithCommentsDecoder) for f in sockets_files]
+    sockets_files_data.sort(key=lambda data: data["bl_version"])
+
+    all_socket_data = {}
+    for data in sockets_files_data:
+        if tuple(data["bl_version"]) <= tuple(max_bl_version):
+            all_socket_data.update(data["nodes"])
+
+    return all_socket_data
+
+
+class SocketTypeIndex:
+    """An inverted index from socket types to the nodes that have a socket of that type.
+    This allows finding all of the nodes that can be connected to a socket with a few set operations,
+    rather than checking every node individually."""
+
+    def __init__(self, socket_data: dict, types: dict):
+        self.types = types
+        self.known_nodes = set(socket_data.keys())
+        self.inputs: dict[str, set[str]] = {}
+        self.outputs: dict[str, set[str]] = {}
+        for idname, node_socket_data in socket_data.items():
+            for socket_type in node_socket_data["inputs"]:
+                self.inputs.setdefault(socket_type, set()).add(idname)
+            for socket_type in node_socket_data["outputs"]:
+                self.outputs.setdefault(socket_type, set()).add(idname)
+        self._compatible_nodes: dict[tuple[str, bool], frozenset[str]] = {}
+
+    def get_compatible_nodes(self, socket_type: str, is_output: bool) -> frozenset[str]:
+        """Get the idnames of all nodes with a socket that can be connected to a socket of the given type."""
+        key = (socket_type, is_output)
+        if (nodes := self._compatible_nodes.get(key)) is not None:
+            return nodes
+
+        index = self.inputs if is_output else self.outputs
+        nodes = set()
+        for valid_type in get_connectable_types(socket_type, self.types):
+            nodes |= index.get(valid_type, set())
+        nodes = frozenset(nodes)
+        self._compatible_nodes[key] = nodes
+        return nodes
+
+    def get_insert_valid_nodes(self, from_socket, to_sockets: list) -> frozenset[str]:
+        """Get the idnames of all nodes that can be inserted into a link.
+        They must be able to take the from socket as an input, and feed all of the to sockets from an output."""
+        nodes = self.get_compatible_nodes(from_socket.bl_idname, from_socket.is_output)
+        for to_socket in to_sockets:
+            nodes = nodes & self.get_compatible_nodes(to_socket.bl_idname, to_socket.is_output)
+        return nodes
+
+    def is_node_valid(self, idname: str, valid_nodes: frozenset[str]) -> bool:
+        """Check if a node is in the given valid nodes, treating nodes without socket data as valid."""
+        return idname in valid_nodes or idname not in self.known_nodes
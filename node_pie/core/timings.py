@@ -0,0 +1,89 @@
+"""Lightweight timing of the hot paths of the addon, to find out where the latency of the pie comes from.
+Timings are only recorded when enabled, and otherwise have close to no overhead."""
+
+import json
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from pathlib import Path
+from statistics import quantiles
+from time import perf_counter, time
+
+_null_span = nullcontext()
+
+
+class Timings:
+    """A fixed size ring buffer of named timing spans"""
+
+    def __init__(self, size=2000):
+        self.enabled = False
+        self.spans: deque[tuple[str, float, float]] = deque(maxlen=size)
+
+    def start(self) -> float:
+        """Get the start time of a span, to be passed to `record`"""
+        return perf_counter() if self.enabled else 0
+
+    def record(self, name: str, start: float):
+        """Record a span that started at the given time and ends now"""
+        if self.enabled and start:
+            self.spans.append((name, time(), perf_counter() - start))
+
+    def add(self, name: str, duration: float):
+        """Record a span whose duration has already been measured"""
+        if self.enabled:
+            self.spans.append((name, time(), duration))
+
+    @contextmanager
+    def _span(self, name: str):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((name, time(), perf_counter() - start))
+
+    def span(self, name: str):
+        """A context manager that records the time taken by its body"""
+        return self._span(name) if self.enabled else _null_span
+
+    def timed(self, name: str):
+        """A decorator that records the time taken by each call of the function"""
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self._span(name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def get_stats(self) -> dict[str, dict[str, float]]:
+        """Get the number of calls and the median, 95th percentile and max time in seconds of each span"""
+        durations: dict[str, list[float]] = {}
+        for name, _, duration in self.spans:
+            durations.setdefault(name, []).append(duration)
+
+        stats = {}
+        for name, values in sorted(durations.items()):
+            if len(values) > 1:
+                percentiles = quantiles(values, n=100, method="inclusive")
+                p50, p95 = percentiles[49], percentiles[94]
+            else:
+                p50 = p95 = values[0]
+            stats[name] = {"count": len(values), "p50": p50, "p95": p95, "max": max(values)}
+        return stats
+
+    def export(self, path: Path):
+        """Write all recorded spans to a JSON lines file, one span per line"""
+        with open(path, "w") as f:
+            for name, timestamp, duration in self.spans:
+                f.write(json.dumps({"span": name, "time": timestamp, "duration": duration}) + "\n")
+
+    def clear(self):
+        self.spans.clear()
+
+
+timings = Timings()
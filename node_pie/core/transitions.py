@@ -0,0 +1,63 @@
+"""Counts of which nodes are added after dragging a link from each kind of socket, used to suggest the next node.
+Each key only keeps a fixed number of nodes, so the table stays small however many different nodes are added."""
+
+import json
+from pathlib import Path
+
+
+class TransitionCounts:
+    """The number of times each node has been added from a socket, keyed by the source node and socket type.
+    When a key is full, a new node replaces the least added one and takes over its count plus one.
+    This is the space saving algorithm, which lets nodes that start being used often still reach the top."""
+
+    def __init__(self, path: Path, top_k: int = 16):
+        self.path = path
+        self.top_k = top_k
+        self._counts: dict[str, dict[str, int]] | None = None
+        # The nodes for each key, sorted from most to least added. Only rebuilt for a key when it changes.
+        self._ranked: dict[str, list[tuple[str, int]]] = {}
+
+    @staticmethod
+    def get_key(source_idname: str, socket_type: str, is_output: bool) -> str:
+        return f"{source_idname}|{socket_type}|{'out' if is_output else 'in'}"
+
+    @property
+    def counts(self) -> dict[str, dict[str, int]]:
+        if self._counts is None:
+            self._counts = {}
+            try:
+                data = json.loads(self.path.read_text())
+                self._counts = {k: dict(v) for k, v in data.get("transitions", {}).items()}
+            except (OSError, json.JSONDecodeError, TypeError, ValueError, AttributeError):
+                pass
+        return self._counts
+
+    def add(self, key: str, node_id: str):
+        nodes = self.counts.setdefault(key, {})
+        if node_id in nodes:
+            nodes[node_id] += 1
+        elif len(nodes) < self.top_k:
+            nodes[node_id] = 1
+        else:
+            least = min(nodes, key=nodes.get)
+            nodes[node_id] = nodes.pop(least) + 1
+        self._ranked.pop(key, None)
+        self.save()
+
+    def get_ranked(self, key: str) -> list[tuple[str, int]]:
+        """Get the nodes added from the given key and their counts, most added first"""
+        if (ranked := self._ranked.get(key)) is None:
+            nodes = self.counts.get(key, {})
+            ranked = sorted(nodes.items(), key=lambda item: item[1], reverse=True)
+            self._ranked[key] = ranked
+        return ranked
+
+    def save(self):
+        # Stored as lists of pairs rather than dicts, sorted so that the file is easy to read
+        data = {"transitions": {k: self.get_ranked(k) for k in sorted(self.counts)}}
+        self.path.write_text(json.dumps(data, separators=(",", ":")))
+
+    def reset(self):
+        self._counts = {}
+        self._ranked = {}
+        self.save()
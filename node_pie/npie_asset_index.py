@@ -0,0 +1,184 @@
+"""Keeps the index of node group assets in the local asset libraries up to date, see `core.assets`.
+The libraries are checked and files are read in a timer, a few at a time, so that indexing a large library
+doesn't freeze the interface."""
+
+import os
+from pathlib import Path
+from time import perf_counter
+from typing import Iterator
+
+import bpy
+from bpy.types import Context
+
+from .core.assets import AssetEntry, AssetIndex, iter_blend_files, read_catalogs
+from .core.search import SearchEntry, SearchIndex
+from .npie_helpers import get_cache_dir, get_prefs
+from .npie_popularity import get_layered_counts, get_layered_counts_version
+
+# The maximum time that each step of the timer can spend reading files
+STEP_TIME = 0.05
+
+
+def get_library_dirs(context: Context) -> list[Path]:
+    """Get the directories of all local asset libraries"""
+    dirs = []
+    for library in context.preferences.filepaths.asset_libraries:
+        if library.path and (path := Path(bpy.path.abspath(library.path))).is_dir():
+            dirs.append(path)
+    return dirs
+
+
+def read_node_group_assets(path: Path, catalogs: dict[str, str]) -> list[AssetEntry]:
+    """Read the node group assets in a .blend file, without adding them to the current file"""
+    assets = []
+    with bpy.data.temp_data() as temp_data:
+        with temp_data.libraries.load(str(path), link=True, assets_only=True) as (data_from, data_to):
+            data_to.node_groups = data_from.node_groups
+        for node_group in data_to.node_groups:
+            if node_group and node_group.asset_data:
+                catalog = catalogs.get(node_group.asset_data.catalog_id, "")
+                assets.append(AssetEntry(node_group.name, node_group.bl_idname, catalog, str(path)))
+    return assets
+
+
+class AssetIndexer:
+    """Updates the asset index with the files that have changed since it was last saved"""
+
+    def __init__(self):
+        self._index: AssetIndex | None = None
+        self.queue: list[tuple[Path, os.stat_result, dict[str, str]]] = []
+        # Finds the files that need to be read, a few at a time. None once all of the libraries have been checked.
+        self.scan: Iterator[tuple[Path, os.stat_result | None]] | None = None
+        # The catalogs of the library that each file found by the scan is in
+        self.catalogs: dict[Path, dict[str, str]] = {}
+        self.running = False
+        # The most popular assets for each tree type, along with the versions of the data they were computed from
+        self._popular: dict[str, tuple[tuple, list[AssetEntry]]] = {}
+        # The search index of the assets for each tree type, along with the generation of the index it was built from
+        self._search: dict[str, tuple[int, SearchIndex]] = {}
+
+    @property
+    def index(self) -> AssetIndex:
+        if not self._index:
+            self._index = AssetIndex(get_cache_dir() / "asset_index.json")
+            self._index.load()
+        return self._index
+
+    def start(self):
+        """Start updating the index in the background, if it isn't already being updated"""
+        if not self.running:
+            self.running = True
+            bpy.app.timers.register(find_stale_files, first_interval=0.5)
+
+    def iter_library_files(self) -> Iterator[Path]:
+        """Get the .blend files in all asset libraries, recording the catalogs of the library each one is in"""
+        for library_dir in get_library_dirs(bpy.context):
+            catalogs = read_catalogs(library_dir)
+            for file in iter_blend_files(library_dir):
+                self.catalogs[file] = catalogs
+                yield file
+
+    def find_stale_files(self):
+        self.catalogs = {}
+        self.queue = []
+        self.scan = self.index.iter_stale_files(self.iter_library_files())
+        bpy.app.timers.register(index_step)
+
+    def step(self):
+        index = self.index
+        start = perf_counter()
+
+        # Walking and checking the libraries can be slow too, so it is spread over steps in the same way as reading
+        if self.scan:
+            for file, stat in self.scan:
+                if stat:
+                    self.queue.append((file, stat, self.catalogs[file]))
+                if perf_counter() - start > STEP_TIME:
+                    return 0.1
+            self.scan = None
+            self.catalogs = {}
+
+        while self.queue and perf_counter() - start < STEP_TIME:
+            file, stat, catalogs = self.queue.pop()
+            try:
+                assets = read_node_group_assets(file, catalogs)
+            except (OSError, RuntimeError) as e:
+                print(f"Node Pie: Couldn't read assets from {file}: {e}")
+                assets = []
+            index.update_file(file, stat, assets)
+
+        if self.queue:
+            return 0.1
+        if index.dirty:
+            index.save()
+        self.running = False
+        return None
+
+    def stop(self):
+        for func in [find_stale_files, index_step]:
+            if bpy.app.timers.is_registered(func):
+                bpy.app.timers.unregister(func)
+        if self.scan:
+            self.scan.close()
+            self.scan = None
+        if self._index and self._index.dirty:
+            self._index.save()
+        self.running = False
+
+    def get_popular_assets(self, context: Context, tree_type: str, count: int) -> list[AssetEntry]:
+        """Get the assets for the given tree type that have been added most often.
+        Assets that haven't been added yet fill the remaining space, in catalog order."""
+        key = (get_layered_counts_version(context), self.index.generation, count)
+        if (cached := self._popular.get(tree_type)) and cached[0] == key:
+            return cached[1]
+
+        counts = get_layered_counts(context, tree_type)
+
+        assets = sorted(
+            self.index.get_assets(tree_type),
+            key=lambda a: (-counts.get(a.popularity_id, 0), a.catalog, a.name),
+        )
+        self._popular[tree_type] = (key, assets[:count])
+        return assets[:count]
+
+    def get_search_index(self, tree_type: str) -> SearchIndex:
+        """Get a search index of the assets for the given tree type, so that every asset can be found from the pie"""
+        generation = self.index.generation
+        if (cached := self._search.get(tree_type)) and cached[0] == generation:
+            return cached[1]
+
+        entries = [
+            SearchEntry(
+                f"{asset.name} (Asset)",
+                "node_pie.add_asset",
+                {"path": asset.path, "name": asset.name},
+                asset.catalog,
+                asset.popularity_id,
+                is_operator=True,
+            )
+            for asset in self.index.get_assets(tree_type)
+        ]
+        index = SearchIndex(entries)
+        self._search[tree_type] = (generation, index)
+        return index
+
+
+asset_indexer = AssetIndexer()
+
+
+# Timers are registered with plain functions, as a new bound method is created each time one is accessed
+def find_stale_files():
+    asset_indexer.find_stale_files()
+
+
+def index_step():
+    return asset_indexer.step()
+
+
+def register():
+    if get_prefs(bpy.context).npie_index_assets:
+        asset_indexer.start()
+
+
+def unregister():
+    asset_indexer.stop()
@@ -0,0 +1,119 @@
+"""Automatic pie layout for node trees that don't have a definition file.
+The categories are packed into columns based on how many items they contain,
+and the result is memoized so that redraws only need to replay it."""
+
+import random
+from dataclasses import dataclass
+
+CATEGORY_COLORS = [
+    "converter",
+    "color",
+    # "distor",
+    "input",
+    "output",
+    "filter",
+    "vector",
+    "texture",
+    "shader",
+    # "script",
+    "geometry",
+    "attribute",
+]
+
+
+@dataclass
+class AutoLayout:
+    """The packed layout of a set of categories.
+
+    The structure of areas is [left, right, bottom, top], matching the pie order of west, east, south and north.
+    Each area is a list of columns, and each column is a list of category identifiers, in the order they are drawn."""
+
+    areas: list[list[list[str]]]
+    colors: dict[str, str]
+
+
+def pack_categories(sizes: dict[str, int]) -> list[list[list[str]]]:
+    """Pack categories into the four areas of the pie, as space efficiently as possible.
+    `sizes` maps each category identifier to the number of items in it."""
+
+    # Sort the categories based on the number of nodes they contain.
+    categories = sorted(sizes, key=lambda cat: sizes[cat])
+    if not categories:
+        return [[], [], [], []]
+
+    # Pick two categories from the middle of the list, and draw them in the top and bottom of the pie.
+    # From the middle so that they aren't too big and aren't too small.
+    areas: list[list[list[str]]] = [[], [], [], []]
+    areas[2] = [[categories.pop(len(categories) // 2)]]
+    if categories:
+        areas[3] = [[categories.pop(len(categories) // 2 - 1)]]
+    if not categories:
+        return areas
+
+    def add_categories(to_add: list[str], i: int, max_height: int):
+        """
+        Add the given categories to the given area.
+        The categories are packed according to their height relative to the provided max size.
+        """
+        columns = areas[i]
+        # Keep track of the height of each column, rather than recalculating it for each category
+        heights = []
+        for k, cat in enumerate(to_add):
+            categories.remove(cat)
+            size = sizes[cat]
+
+            # Loop over all columns and if current category fits in one, add it, else create a new column
+            # The first category always gets its own column
+            for j, column in enumerate(columns if k else []):
+                # Add an extra item to account for the heading of each category
+                if heights[j] + size < max_height:
+                    column.append(cat)
+                    heights[j] += size + 1
+                    break
+            else:
+                columns.append([cat])
+                heights.append(size + 1)
+
+        if i:
+            columns.reverse()
+
+    # Add half the categories, alternating so that both sides get a mix of sizes
+    biggest = sizes[categories[-1]]
+    add_categories(categories[::-2], 0, biggest)
+
+    # Add the other half, which is now just the rest of them
+    add_categories(categories[::-1], 1, biggest)
+
+    # Use this to control whether the big nodes are at the center or at the edges
+    return [area[::-1] for area in areas]
+
+
+def assign_colors(areas: list[list[list[str]]], seed: str) -> dict[str, str]:
+    """Give each category a pseudo random color, that is consistent between redraws"""
+    rand = random.Random(seed)
+    colors = {}
+    new_colors = []
+    for area in areas:
+        for column in area:
+            for cat in column:
+                if not new_colors:
+                    new_colors = CATEGORY_COLORS.copy()
+                colors[cat] = new_colors.pop(rand.randint(0, len(new_colors) - 1))
+    return colors
+
+
+# The most recent layout for each tree type, along with the category sizes it was computed from
+auto_layouts: dict[str, tuple[tuple, AutoLayout]] = {}
+
+
+def get_auto_layout(tree_type: str, sizes: dict[str, int]) -> AutoLayout:
+    """Get the packed layout for the given categories, only recomputing it if they have changed"""
+    signature = tuple(sizes.items())
+    cached = auto_layouts.get(tree_type)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    areas = pack_categories(sizes)
+    layout = AutoLayout(areas, assign_colors(areas, tree_type))
+    auto_layouts[tree_type] = (signature, layout)
+    return layout
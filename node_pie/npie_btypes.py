@@ -2,12 +2,14 @@ import copy
 import importlib
 import inspect
 import pkgutil
+import sys
 import typing
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from dataclasses import dataclass
 from enum import Enum
 from functools import wraps
 from pathlib import Path
+from time import perf_counter
 from types import ModuleType
 from typing import (
     TYPE_CHECKING,
@@ -67,6 +69,7 @@ __all__ = [
     "FunctionToOperator",
     "CustomProperty",
     "configure",
+    "get_startup_times",
     "register",
     "unregister",
 ]
@@ -82,21 +85,39 @@ class Config:
 
     all_modules: list[ModuleType] = []
     register_list: list[bpy_struct] = []
+    # The last computed registration order, along with the list of classes it was computed from
+    register_order: tuple[tuple, list[bpy_struct]] = ((), [])
 
+    # Modules that aren't imported when loading the addon, only when they are first used.
+    lazy_modules: set[str] = set()
 
-def configure(addon_string: str = "", auto_register: bool = False):
+    # The time in seconds taken to import each module, and to register everything.
+    # Import times include any modules that were imported for the first time by that module.
+    import_times: dict[str, float] = {}
+    register_time: float = 0.0
+
+
+def configure(addon_string: str = "", auto_register: bool = False, lazy_modules: set[str] = set()):
     """Configure btypes settings for this addon, should usually be called in the root init file.
     This must be called in the root init file.
     Make sure it is called before auto_load.init() in order for the configuration to apply before registration.
 
     addon_string: The name of the addon. Used to set the subpath of operators e.g. `bpy.ops.addon_string.op`
-    auto_register: Whether to automatically register classes created using btypes decorators."""
+    auto_register: Whether to automatically register classes created using btypes decorators.
+    lazy_modules: Module names relative to the root, that don't define any classes that need to be registered,
+        and so don't need to be imported when the addon loads. e.g. `{"utils.drawing"}`"""
     Config.addon_string = addon_string
     Config.register = auto_register
+    Config.lazy_modules = set(lazy_modules)
     if auto_register:
         Config.all_modules = _get_modules()
 
 
+def get_startup_times() -> list[tuple[str, float]]:
+    """Get the time taken to import each module, slowest first"""
+    return sorted(Config.import_times.items(), key=lambda item: item[1], reverse=True)
+
+
 def _get_modules() -> list[ModuleType]:
     """Get the list of modules in the addon using btypes"""
 
@@ -112,8 +133,9 @@ def _get_modules() -> list[ModuleType]:
                 module_names.append(root + module_name)
         return module_names
 
-    # Get the file that configure() was called from
-    file = Path(inspect.stack()[2].filename).parent
+    # Get the file that configure() was called from.
+    # inspect.stack() is much slower, as it reads the source of every frame.
+    file = Path(sys._getframe(2).f_code.co_filename).parent
     module_names = sorted(get_module_names(file))
 
     # Get the base package. This includes bl_ext.repo in 4.2 and above
@@ -123,10 +145,12 @@ def _get_modules() -> list[ModuleType]:
     all_modules = []
     for name in module_names:
         # Ignore self
-        if base_package + "." + name == __name__:
+        if base_package + "." + name == __name__ or name in Config.lazy_modules:
             continue
         # Import all files in module to load them.
+        start = perf_counter()
         all_modules.append(importlib.import_module("." + name, package=base_package))
+        Config.import_times[name] = perf_counter() - start
 
     # observe custom __reg_order__ parameter
     all_modules.sort(key=lambda m: getattr(m, "__reg_order__", 100))
@@ -1266,47 +1290,68 @@ class BNode:
         return Wrapped
 
 
-def _get_dependencies():
+def _get_dependencies() -> dict[type, list[type]]:
     """
-    Get a dictionary of each class and the classes that it depends on.
+    Get a dictionary of each class and the classes that it depends on, in the order they were found.
     Currently this takes into account property groups, and their Pointer and Collection properties.
     """
-
-    # Get the direct children of each class
-    children = {}
+    registered = set(Config.register_list)
+    dependencies = {}
     for cls in Config.register_list:
-        if issubclass(cls, PropertyGroup):
-            children[cls] = set()
-            for name, value in typing.get_type_hints(cls, {}, {}).items():
-                if not isinstance(value, bpy.props._PropertyDeferred):
-                    continue
-                child = value.keywords.get("type")
-                if child is None:
-                    continue
-                children[cls].add(child)
+        dependencies[cls] = []
+        if not issubclass(cls, PropertyGroup):
+            continue
+        for name, value in typing.get_type_hints(cls, {}, {}).items():
+            if not isinstance(value, bpy.props._PropertyDeferred):
+                continue
+            child = value.keywords.get("type")
+            # Classes registered elsewhere don't affect the order
+            if child in registered and child not in dependencies[cls]:
+                dependencies[cls].append(child)
+    return dependencies
 
-    dependencies = {}
 
-    def get_deps(cls):
-        """Recursively get the classes that have the given class as a child"""
-        deps = {c for c, child_list in children.items() if cls in child_list}
+def _get_register_order() -> list[type]:
+    """
+    Sort the classes to register so that each class comes after the classes it depends on, using Kahn's algorithm.
+    Classes that don't depend on each other keep the order they were defined in.
+    The result is cached until another class is added.
+    """
+    key = tuple(Config.register_list)
+    if Config.register_order[0] == key:
+        return Config.register_order[1]
+
+    dependencies = _get_dependencies()
+    dependents: dict[type, list[type]] = {cls: [] for cls in dependencies}
+    remaining = {}
+    for cls, deps in dependencies.items():
+        remaining[cls] = len(deps)
         for dep in deps:
-            deps = deps.union(get_deps(dep))
-        return deps
+            dependents[dep].append(cls)
 
-    for cls in Config.register_list:
-        dependencies[cls] = get_deps(cls)
+    queue = deque(cls for cls in Config.register_list if not remaining[cls])
+    order = []
+    while queue:
+        cls = queue.popleft()
+        order.append(cls)
+        for dependent in dependents[cls]:
+            remaining[dependent] -= 1
+            if not remaining[dependent]:
+                queue.append(dependent)
 
-    return dependencies
+    if len(order) != len(dependencies):
+        cycle = [cls.__name__ for cls in Config.register_list if remaining[cls]]
+        raise ValueError(f"Circular property group dependencies, can't register: {', '.join(cycle)}")
+
+    Config.register_order = (key, order)
+    return order
 
 
 def register():
+    start = perf_counter()
     if Config.register:
         # Sort classes so that they can register in the correct order without errors
-        dependencies = _get_dependencies()
-        Config.register_list.sort(key=lambda cls: len(dependencies[cls]), reverse=True)
-
-        for cls in Config.register_list:
+        for cls in _get_register_order():
             bpy.utils.register_class(cls)
 
     for pgroup in property_groups:
@@ -1316,6 +1361,7 @@ def register():
         for module in Config.all_modules:
             if hasattr(module, "register"):
                 module.register()
+    Config.register_time = perf_counter() - start
 
 
 def unregister():
@@ -1323,7 +1369,7 @@ def unregister():
         pgroup._unregister()
 
     if Config.register:
-        for cls in Config.register_list:
+        for cls in reversed(_get_register_order()):
             bpy.utils.unregister_class(cls)
 
         for module in Config.all_modules:
@@ -0,0 +1,155 @@
+"""Command line tools for maintaining the node pie data files, that can be run without opening the Blender UI.
+
+Usage:
+    blender --background --factory-startup --python node_pie/npie_cli.py -- socket-types [options]
+    blender --background --factory-startup --python node_pie/npie_cli.py -- missing-nodes [options]
+    blender --background --factory-startup --python node_pie/npie_cli.py -- memory [options]
+
+Run with `-- --help` for the full list of commands and options."""
+
+import argparse
+import importlib
+import json
+import subprocess
+import sys
+import tracemalloc
+from pathlib import Path
+
+import bpy
+
+BUILTIN_TREE_TYPES = ["GeometryNodeTree", "ShaderNodeTree", "CompositorNodeTree"]
+
+
+def import_node_pie():
+    """Import the node pie package from the addon this file is in.
+    This is needed because the addon is not enabled in background mode."""
+    addon_dir = Path(__file__).resolve().parents[1]
+    if str(addon_dir.parent) not in sys.path:
+        sys.path.insert(0, str(addon_dir.parent))
+    return importlib.import_module(f"{addon_dir.name}.node_pie")
+
+
+def run_workers(command: list[str], tree_types: list[str], jobs: int) -> int:
+    """Run the given command in a separate background Blender process for each tree type, in parallel.
+    Returns the number of workers that failed."""
+    failed = 0
+    pending = list(tree_types)
+    running: list[tuple[str, subprocess.Popen]] = []
+    while pending or running:
+        while pending and len(running) < jobs:
+            tree_type = pending.pop(0)
+            args = [bpy.app.binary_path, "--background", "--factory-startup", "--python", __file__, "--"]
+            args += command + ["--tree-types", tree_type, "--jobs", "1"]
+            running.append((tree_type, subprocess.Popen(args)))
+
+        tree_type, process = running.pop(0)
+        if process.wait():
+            print(f"Node Pie: Worker for {tree_type} failed with exit code {process.returncode}")
+            failed += 1
+    return failed
+
+
+def generate_socket_types(tree_types: list[str], output: Path) -> int:
+    """Generate the socket types files for the given node tree types, using scratch node trees."""
+    node_pie = import_node_pie()
+    generate = importlib.import_module(".npie_generate_socket_types", node_pie.__name__)
+
+    for tree_type in tree_types:
+        node_tree = bpy.data.node_groups.new(".npie_scratch", tree_type)
+        try:
+            idnames = generate.get_def_file_node_types(bpy.context, tree_type)
+            all_node_data = generate.get_nodes_socket_types(node_tree, idnames)
+            path = generate.write_socket_types_file(tree_type, all_node_data, output)
+        finally:
+            bpy.data.node_groups.remove(node_tree)
+
+        if path:
+            print(f"Node Pie: Wrote socket types for {len(idnames)} {tree_type} nodes to {path}")
+        else:
+            print(f"Node Pie: No new socket information for {tree_type} in this Blender version")
+    return 0
+
+
+def report_missing_nodes(tree_types: list[str], output: Path | None) -> int:
+    """Print the nodes that are missing from, or unused by the pie for each node tree type as JSON."""
+    node_pie = import_node_pie()
+    availability = importlib.import_module(".npie_node_availability", node_pie.__name__)
+
+    report = {tree_type: availability.get_missing_nodes_report(bpy.context, tree_type) for tree_type in tree_types}
+    report_str = json.dumps(report, indent=2)
+    if output:
+        output.write_text(report_str)
+    else:
+        print(report_str)
+    return 0
+
+
+def measure_memory(tree_types: list[str]) -> int:
+    """Print the memory used by the resolved node definitions of each node tree type."""
+    node_pie = import_node_pie()
+    def_file = importlib.import_module(".npie_node_def_file", node_pie.__name__)
+
+    print(f"{'Tree type':<24}{'Items':>8}{'Memory':>12}{'Per item':>12}")
+    for tree_type in tree_types:
+        # Import and parse everything once first, so that only the definitions themselves are measured
+        def_file.load_custom_nodes_info(tree_type, bpy.context)
+
+        tracemalloc.start()
+        categories, layout = def_file.load_custom_nodes_info(tree_type, bpy.context)
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        num_items = sum(len(cat.nodes) for cat in categories.values())
+        per_item = size / num_items if num_items else 0
+        print(f"{tree_type:<24}{num_items:>8}{size / 1024:>10.1f}KB{per_item:>11.0f}B")
+        # Free the definitions before measuring the next tree type
+        del categories, layout
+    return 0
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="npie_cli", description=__doc__.split("\n")[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sockets_parser = subparsers.add_parser(
+        "socket-types",
+        help="Generate the socket types files for the current Blender version",
+    )
+    sockets_parser.add_argument("--output", type=Path, help="The directory to write to (default: node_def_files/sockets)")
+    sockets_parser.add_argument("--tree-types", nargs="+", default=BUILTIN_TREE_TYPES)
+    sockets_parser.add_argument("--jobs", type=int, default=len(BUILTIN_TREE_TYPES), help="Number of worker processes")
+
+    missing_parser = subparsers.add_parser(
+        "missing-nodes",
+        help="Report the nodes that are missing from the pie, and the nodes in the pie that no longer exist",
+    )
+    missing_parser.add_argument("--output", type=Path, help="The file to write the JSON report to (default: stdout)")
+    missing_parser.add_argument("--tree-types", nargs="+", default=BUILTIN_TREE_TYPES)
+
+    memory_parser = subparsers.add_parser(
+        "memory",
+        help="Measure the memory used by the resolved node definitions of each node tree type",
+    )
+    memory_parser.add_argument("--tree-types", nargs="+", default=BUILTIN_TREE_TYPES)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "socket-types":
+        output = args.output or Path(__file__).parent / "node_def_files" / "sockets"
+        if args.jobs > 1 and len(args.tree_types) > 1:
+            # Each tree type is independent, so process them in parallel
+            return run_workers(["socket-types", "--output", str(output)], args.tree_types, args.jobs)
+        return generate_socket_types(args.tree_types, output)
+
+    elif args.command == "missing-nodes":
+        return report_missing_nodes(args.tree_types, args.output)
+
+    elif args.command == "memory":
+        return measure_memory(args.tree_types)
+
+    return 1
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+    sys.exit(main(argv))
@@ -10,11 +10,16 @@ IS_5_0 = bpy.app.version >= (5, 0, 0)
 IS_MACOS = platform.system() == "Darwin"
 IS_WINDOWS = platform.system() == "Windows"
 
+# This is created the first time a node is added, rather than when the addon is loaded
 POPULARITY_FILE = Path(__file__).parent / "nodes.json"
-if not POPULARITY_FILE.exists():
-    with open(POPULARITY_FILE, "w") as f:
-        pass
-POPULARITY_FILE_VERSION = (0, 0, 1)
+# Used instead of the popularity file when the SQLite backend is enabled
+POPULARITY_DB_FILE = Path(__file__).parent / "nodes.db"
+# A studio wide baseline, generated with npie_merge_popularity.py
+POPULARITY_BASELINE_FILE = Path(__file__).parent / "nodes_baseline.json"
+# The nodes added most recently in each tree type
+POPULARITY_RECENT_FILE = Path(__file__).parent / "nodes_recent.json"
+# The nodes added after dragging a link from each kind of socket
+POPULARITY_TRANSITIONS_FILE = Path(__file__).parent / "nodes_transitions.json"
 
 NODE_DEF_EXAMPLE_PREFIX = "node_def_"
 NODE_DEF_DIR = Path(__file__).parent / "node_def_files"
@@ -0,0 +1,11 @@
+from pathlib import Path
+
+from .core.def_files import DefFileEntry, DefFileIndex
+from .npie_constants import NODE_DEF_BUILTIN, NODE_DEF_DIR, NODE_DEF_EXAMPLE_PREFIX, NODE_DEF_USER
+
+def_file_index = DefFileIndex(NODE_DEF_DIR, NODE_DEF_BUILTIN, NODE_DEF_USER, ignore_prefix=NODE_DEF_EXAMPLE_PREFIX)
+
+
+def get_all_def_files() -> list[Path]:
+    def_file_index.refresh()
+    return def_file_index.get_all_paths()
@@ -0,0 +1,66 @@
+from collections import deque
+
+from .npie_timings import timings
+
+
+class DrawBudget:
+    """Keeps track of how long the pie menu takes to draw.
+    If it consistently goes over the time budget, the expensive extra features are progressively disabled,
+    and re-enabled once drawing is comfortably within the budget again."""
+
+    # The features that are disabled at each level, in order
+    FEATURES = [
+        "Inactive backgrounds and overlaid variant menus",
+        "Popularity sizes",
+        "Greying out invalid nodes",
+    ]
+
+    def __init__(self):
+        self.level = 0
+        self.peak_level = 0
+        self.last_time = 0.0
+        self.times: deque[float] = deque(maxlen=3)
+
+    @property
+    def use_overlays(self) -> bool:
+        return self.level < 1
+
+    @property
+    def use_variable_sizes(self) -> bool:
+        return self.level < 2
+
+    @property
+    def use_validity(self) -> bool:
+        return self.level < 3
+
+    @property
+    def disabled_features(self) -> list[str]:
+        return self.FEATURES[: self.level]
+
+    def record(self, draw_time: float, budget: float):
+        """Record the time taken by the most recent draw, both in seconds. A budget of 0 disables the guard."""
+        self.last_time = draw_time
+        if not budget:
+            self.reset()
+            return
+
+        self.times.append(draw_time)
+        # Only degrade if more than one draw in a row is too slow, to avoid reacting to one-off spikes
+        if self.level < len(self.FEATURES) and len(self.times) > 1 and min(list(self.times)[-2:]) > budget:
+            self.level += 1
+            self.peak_level = max(self.peak_level, self.level)
+            self.times.clear()
+            # Recorded with the time of the draw that caused it, so that it shows up next to the slow draws
+            timings.add(f"draw_budget.disable.{self.level}", draw_time)
+
+        elif self.level and len(self.times) == self.times.maxlen and max(self.times) < budget / 2:
+            self.level -= 1
+            self.times.clear()
+
+    def reset(self):
+        self.level = 0
+        self.peak_level = 0
+        self.times.clear()
+
+
+draw_budget = DrawBudget()
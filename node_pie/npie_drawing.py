@@ -5,25 +5,24 @@ from mathutils import Vector as V
 
 from .npie_constants import IS_4_0, IS_MACOS, SHADERS_DIR
 
-# Create the the antialiased line shader
-# This is not trivial...
-# And it doesn't work on Apple Silicone because of course it doesn't
+# The shader is created the first time a line is drawn rather than on import,
+# as compiling it adds noticeably to the time taken to load the addon
+_line_shader: GPUShader | None = None
 
-if IS_MACOS:
-    name = "UNIFORM_COLOR" if IS_4_0 else "2D_UNIFORM_COLOR"
-    line_shader: GPUShader = gpu.shader.from_builtin(name)
 
-    def draw_line(from_pos: V, to_pos: V, color: V, width=1):
-        """Draw a rubbish normal line"""
+def get_line_shader() -> GPUShader:
+    """Create the the antialiased line shader.
+    This is not trivial...
+    And it doesn't work on Apple Silicone because of course it doesn't"""
+    global _line_shader
+    if _line_shader:
+        return _line_shader
 
-        batch: GPUBatch = batch_for_shader(line_shader, "LINES", {"pos": [from_pos, to_pos]})
-        line_shader.bind()
-        gpu.state.blend_set("ALPHA")
-        gpu.state.line_width_set(width * 3)
-        line_shader.uniform_float("color", color)
-        batch.draw(line_shader)
+    if IS_MACOS:
+        name = "UNIFORM_COLOR" if IS_4_0 else "2D_UNIFORM_COLOR"
+        _line_shader = gpu.shader.from_builtin(name)
+        return _line_shader
 
-else:
     vert_code = (SHADERS_DIR / "2D_vert.glsl").read_text()
     frag_code = (SHADERS_DIR / "2D_line_antialiased_frag.glsl").read_text()
 
@@ -44,10 +43,28 @@ else:
     line_shader_info.vertex_source(vert_code)
     line_shader_info.fragment_source(frag_code)
 
-    line_shader = gpu.shader.create_from_info(line_shader_info)
+    _line_shader = gpu.shader.create_from_info(line_shader_info)
+    return _line_shader
+
+
+if IS_MACOS:
+
+    def draw_line(from_pos: V, to_pos: V, color: V, width=1):
+        """Draw a rubbish normal line"""
+        line_shader = get_line_shader()
+
+        batch: GPUBatch = batch_for_shader(line_shader, "LINES", {"pos": [from_pos, to_pos]})
+        line_shader.bind()
+        gpu.state.blend_set("ALPHA")
+        gpu.state.line_width_set(width * 3)
+        line_shader.uniform_float("color", color)
+        batch.draw(line_shader)
+
+else:
 
     def draw_line(from_pos: V, to_pos: V, color: V, width=1):
         """Draw a beautiful antialiased line"""
+        line_shader = get_line_shader()
 
         # Calculate the tangent
         normal = V(to_pos - from_pos)
@@ -0,0 +1,215 @@
+"""Automatically generate definition files for node trees that don't have one.
+The categories registered with nodeitems_utils can be filtered by their poll functions and can generate their items
+dynamically, so a signature of their contents is stored in the file, and it is rewritten when that changes.
+Introspecting the categories is slow though, so it is only done again when the addon that defines the node tree
+or the set of enabled addons changes, or when a new file is loaded. Otherwise the path is looked up from memory,
+and the pie can be drawn using the same code path as for manually written files."""
+
+import ast
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+import bpy
+import nodeitems_utils
+from bpy.app.handlers import persistent
+from bpy.types import Context, NodeTree
+
+from .npie_auto_layout import assign_colors, pack_categories
+from .npie_helpers import JSONWithCommentsDecoder, get_cache_dir
+
+# Increment this to regenerate all files if the generated format changes
+GENERATED_FILE_VERSION = 2
+
+# The registration key and path of the file that was last generated or loaded for each tree type.
+# None is stored as the path if no nodes could be found for the tree type.
+generated_files: dict[str, tuple[list, Path | None]] = {}
+
+
+def get_generated_defs_dir() -> Path:
+    path = get_cache_dir() / "node_def_files"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def get_source_version(tree_type: str) -> list:
+    """Get an identifier for the version of the addon that defines the given node tree type."""
+    addon_version = None
+    if tree_cls := bpy.types.NodeTree.bl_rna_get_subclass_py(tree_type):
+        # Get the root module of the addon. Extensions are nested under bl_ext.repository_name
+        parts = tree_cls.__module__.split(".")
+        root_name = ".".join(parts[:3] if parts[0] == "bl_ext" else parts[:1])
+        if module := sys.modules.get(root_name):
+            if bl_info := getattr(module, "bl_info", None):
+                addon_version = list(bl_info.get("version", ()))
+            elif file := getattr(module, "__file__", None):
+                # Fall back to the modification time if there is no version info
+                addon_version = Path(file).stat().st_mtime
+
+    return [GENERATED_FILE_VERSION, list(bpy.app.version), addon_version]
+
+
+def get_settings(settings: dict) -> dict:
+    """Convert node item settings from the python expressions used by nodeitems_utils to actual values."""
+    values = {}
+    for name, value in settings.items():
+        try:
+            values[name] = ast.literal_eval(value) if isinstance(value, str) else value
+        except (ValueError, SyntaxError):
+            # Settings that aren't literals can't be stored in the file
+            continue
+    return values
+
+
+def get_categories_from_node_items(context: Context) -> dict:
+    """Get the node categories registered with nodeitems_utils, in the definition file format"""
+    categories = {}
+    for cat in nodeitems_utils.node_categories_iter(context):
+        # All of the layout nodes can be accessed with shortcuts
+        if cat.name == "Layout":
+            continue
+
+        nodes = []
+        for item in cat.items(context):
+            if not hasattr(item, "nodetype") or not hasattr(item, "label"):
+                nodes.append({"separator": True})
+                continue
+
+            node = {"identifier": item.nodetype, "label": item.label}
+            if settings := get_settings(getattr(item, "settings", {}) or {}):
+                node["settings"] = settings
+            nodes.append(node)
+
+        categories[cat.identifier] = {"label": cat.name, "nodes": nodes}
+    return categories
+
+
+def get_categories_from_node_classes(node_tree: NodeTree) -> dict:
+    """Get all registered python node classes that can be added to the given node tree,
+    grouped into a category for each module that they are defined in."""
+
+    def iter_subclasses(cls):
+        for subclass in cls.__subclasses__():
+            yield subclass
+            yield from iter_subclasses(subclass)
+
+    categories = {}
+    found = set()
+    for cls in iter_subclasses(bpy.types.Node):
+        idname = getattr(cls, "bl_idname", "")
+        if cls.__module__ == "bpy.types" or not idname or idname in found:
+            continue
+        if not getattr(cls, "is_registered", False):
+            continue
+        try:
+            if not cls.poll(node_tree):
+                continue
+        except Exception:
+            continue
+
+        found.add(idname)
+        module_name = cls.__module__.split(".")[-1]
+        category = categories.setdefault(
+            module_name.upper(),
+            {"label": module_name.replace("_", " ").title(), "nodes": []},
+        )
+        category["nodes"].append({"identifier": idname, "label": getattr(cls, "bl_label", "") or idname})
+
+    for category in categories.values():
+        category["nodes"].sort(key=lambda node: node["label"])
+    return categories
+
+
+def get_categories(context: Context) -> dict:
+    """Introspect the node tree in the current context to get the categories of nodes that can be added to it."""
+    categories = get_categories_from_node_items(context)
+    if not categories and context.space_data.edit_tree:
+        categories = get_categories_from_node_classes(context.space_data.edit_tree)
+    return categories
+
+
+def get_categories_signature(categories: dict) -> str:
+    """Get a short hash of the contents of the given categories, which changes if any of the nodes in them change"""
+    data = json.dumps(categories, sort_keys=True, default=str)
+    return hashlib.sha1(data.encode()).hexdigest()[:16]
+
+
+def generate_def_file_data(categories: dict, tree_type: str, generated_from: list) -> dict:
+    """Create the contents of a definition file for the given node tree type from its categories."""
+    # Pack the categories in the same way as the automatic layout
+    areas = pack_categories({idname: len(cat["nodes"]) for idname, cat in categories.items()})
+    colors = assign_colors(areas, tree_type)
+    for idname, category in categories.items():
+        category["color"] = colors.get(idname, "converter")
+
+    # The third and fourth areas are drawn at the bottom and top of the pie respectively
+    layout = {"left": areas[0], "right": areas[1], "bottom": areas[2], "top": areas[3]}
+
+    return {
+        "generated_from": generated_from,
+        "layout": layout,
+        "categories": categories,
+    }
+
+
+def get_registration_key(tree_type: str) -> list:
+    """Get a key that changes whenever the nodes that can be added to the given node tree type could have changed,
+    without having to introspect them."""
+    return get_source_version(tree_type) + [list(bpy.context.preferences.addons.keys())]
+
+
+def get_generated_def_file(context: Context, tree_type: str) -> Path | None:
+    """Get the auto generated definition file for the given node tree type, generating it if necessary.
+    Returns None if no nodes could be found for the node tree."""
+    registration_key = get_registration_key(tree_type)
+    cached = generated_files.get(tree_type)
+    if cached and cached[0] == registration_key and (cached[1] is None or cached[1].exists()):
+        return cached[1]
+
+    path = None
+    if categories := get_categories(context):
+        path = write_def_file(categories, tree_type)
+    generated_files[tree_type] = (registration_key, path)
+    return path
+
+
+def write_def_file(categories: dict, tree_type: str) -> Path:
+    """Write the definition file for the given categories, unless the existing one was generated from the same ones"""
+    # The categories in the file can only be reused if they are the same as the ones available now
+    generated_from = get_source_version(tree_type) + [get_categories_signature(categories)]
+
+    path = get_generated_defs_dir() / f"{tree_type}.jsonc"
+    if path.exists():
+        try:
+            data = json.loads(path.read_text(), cls=JSONWithCommentsDecoder)
+        except json.JSONDecodeError:
+            data = {}
+        if data.get("generated_from") == generated_from:
+            return path
+
+    data = generate_def_file_data(categories, tree_type, generated_from)
+
+    data_str = json.dumps(data, indent=2)
+    data_str = (
+        "// This file was automatically generated by Node Pie, as no definition file exists for this node tree.\n"
+        + "// To customise it, copy it to the node_def_files/user folder of the addon.\n"
+        + data_str
+    )
+    path.write_text(data_str)
+    return path
+
+
+@persistent
+def load_post_handler(*args):
+    # The categories can depend on the contents of the file, so check them again
+    generated_files.clear()
+
+
+def register():
+    bpy.app.handlers.load_post.append(load_post_handler)
+
+
+def unregister():
+    if load_post_handler in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(load_post_handler)
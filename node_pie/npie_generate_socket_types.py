@@ -0,0 +1,117 @@
+"""Functions for generating the socket types files, that tell which nodes are valid during link dragging.
+These don't depend on the UI, so that they can also be run from the command line, see `npie_cli.py`"""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import bpy
+from bpy.types import Context, NodeTree
+
+from .npie_node_def_file import NodeItem, load_custom_nodes_info
+from .npie_node_info import (
+    ALL_TYPES,
+    COMPOSITOR_TYPES,
+    get_node_socket_info,
+    socket_type_indices,
+)
+from .operators import op_add_node
+
+
+@dataclass
+class DummySocket:
+    bl_idname: str
+    is_output: bool
+
+
+def get_def_file_node_types(context: Context, tree_type: str) -> list[str]:
+    """Get the idnames of all nodes in the definition files for the given node tree type."""
+    categories, layout = load_custom_nodes_info(tree_type, context)
+    idnames = []
+    for cat in categories.values():
+        for node_type in cat.nodes:
+            if isinstance(node_type, NodeItem):
+                idnames.append(node_type.idname)
+    return list(dict.fromkeys(idnames))
+
+
+def get_nodes_socket_types(node_tree: NodeTree, idnames: list[str]) -> dict[str, dict[str, list[str]]]:
+    """Get all of the socket types that each of the given node types can have.
+    A single node of each type is created, and then cycled through all possible socket types."""
+    tree_type = node_tree.bl_rna.identifier
+    socket_types = COMPOSITOR_TYPES if tree_type == "CompositorNodeTree" else ALL_TYPES
+    dummy_sockets = [DummySocket(socket_type, True) for socket_type in socket_types]
+
+    all_node_data = {}
+    for idname in idnames:
+        try:
+            node = node_tree.nodes.new(idname)
+        except RuntimeError:
+            print(f"Node Pie: Couldn't create node '{idname}' in {tree_type}")
+            continue
+
+        inputs = set()
+        outputs = set()
+        for socket in dummy_sockets:
+            op_add_node.set_node_settings(socket, node, ui=False)
+            inputs.update(s.bl_idname for s in node.inputs)
+            outputs.update(s.bl_idname for s in node.outputs)
+
+        all_node_data[idname] = {"inputs": list(inputs), "outputs": list(outputs)}
+        node_tree.nodes.remove(node)
+
+    return all_node_data
+
+
+def remove_unchanged_nodes(tree_type: str, all_node_data: dict) -> dict:
+    """Remove nodes that have already been defined in a socket types file for a previous blender version"""
+    version = list(bpy.app.version)
+    version[1] -= 1
+    prev_data = get_node_socket_info(tree_type, max_bl_version=version)
+    new_data = {}
+    for name, node_data in all_node_data.items():
+        if sockets := prev_data.get(name):
+            same_inputs = set(sockets["inputs"]) == set(node_data["inputs"])
+            same_outputs = set(sockets["outputs"]) == set(node_data["outputs"])
+            if same_inputs and same_outputs:
+                continue
+        new_data[name] = node_data
+    return new_data
+
+
+def write_socket_types_file(tree_type: str, all_node_data: dict, directory: Path) -> Path | None:
+    """Write the socket types that are new in this blender version to a file.
+    Returns the path to the file, or None if there are no changes."""
+    all_node_data = remove_unchanged_nodes(tree_type, all_node_data)
+    if not all_node_data:
+        return None
+
+    data = {}
+    data["bl_version"] = bpy.app.version[:2]
+    data["nodes"] = all_node_data
+    data_str = json.dumps(data, indent=2)
+    data_str = (
+        "// This is a list of the socket types of all nodes"
+        + "\n// used for telling whether a node is valid during link drag."
+        + "\n// It contains all of the new and updated nodes in this blender version."
+        + "\n// It can be auto generated using the 'generate socket types file' operator\n"
+        + data_str
+    )
+
+    version_str = "_".join(str(i) for i in bpy.app.version[:2])
+    path = directory / f"{tree_type}_sockets_{version_str}.jsonc"
+    with open(path, "w") as f:
+        f.write(data_str)
+
+    # Make sure the new socket types are used next time the pie is drawn
+    socket_type_indices.pop(tree_type, None)
+    return path
+
+
+def generate_node_socket_info(context: Context, tree_type: str, directory: Path) -> Path | None:
+    """Generate a socket info file for the given node tree.
+    This contains the type of each socket for each node,
+    and is used to tell if a node should be greyed out during link dragging."""
+    idnames = get_def_file_node_types(context, context.area.spaces.active.tree_type)
+    all_node_data = get_nodes_socket_types(context.space_data.edit_tree, idnames)
+    return write_socket_types_file(tree_type, all_node_data, directory)
@@ -1,7 +1,6 @@
-import json
-import re
 from dataclasses import dataclass, field
 from inspect import isclass
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 import bpy
@@ -9,14 +8,16 @@ from bpy.types import AddonPreferences, Context, Node, NodeSocket, NodeTree
 from mathutils import Vector as V
 
 from .. import __package__ as base_package
-from .npie_constants import NODE_DEF_DIR, NODE_DEF_EXAMPLE_PREFIX
+from .core.jsonc import JSONWithCommentsDecoder
 
 if TYPE_CHECKING:
     from .npie_node_def_file import NodeCategory
+    from .npie_prefetch import PiePrefetch
     from .npie_prefs import NodePiePrefs
 else:
     NodePiePrefs = AddonPreferences
     NodeCategory = object
+    PiePrefetch = object
 
 
 @dataclass
@@ -29,6 +30,8 @@ class NpieCache:
     categories: dict[str, NodeCategory] = field(default_factory=dict)
     layout: dict = field(default_factory=dict)
 
+    prefetch: PiePrefetch = None
+
 
 NpieCache = NpieCache()
 
@@ -110,29 +113,14 @@ def get_all_node_types() -> dict[str, Node]:
     return bl_node_types
 
 
-class JSONWithCommentsDecoder(json.JSONDecoder):
-
-    match_trailing_commas: re.Pattern = re.compile(r",(?=\s*?[\}\]])", re.MULTILINE)
-
-    def __init__(self, **kw):
-        super().__init__(**kw)
-
-    def decode(self, s: str):
-        # Remove comments
-        s = "\n".join(line if not line.lstrip().startswith("//") else "" for line in s.split("\n"))
-        # Remove trailing commas
-        s = self.match_trailing_commas.sub("", s)
-        return super().decode(s)
-
-
-def get_all_def_files():
-    files = []
-    for file in NODE_DEF_DIR.rglob("*"):
-        if file.parent.name == "sockets":
-            continue
-        if file.is_file() and file.suffix == ".jsonc" and not file.name.startswith(NODE_DEF_EXAMPLE_PREFIX):
-            files.append(file)
-    return files
+def get_cache_dir() -> Path:
+    """Get the directory used to store generated files, which persists between addon updates"""
+    try:
+        path = bpy.utils.extension_path_user(base_package, path="cache", create=True)
+    except ValueError:
+        # Not installed as an extension
+        path = bpy.utils.user_resource("CONFIG", path="node_pie_cache", create=True)
+    return Path(path)
 
 
 class Rectangle:
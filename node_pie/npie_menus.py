@@ -3,9 +3,11 @@ from bpy.types import UILayout
 from .operators.op_alphabetise_nodes import NPIE_OT_alphabetise_nodes
 
 from .npie_btypes import BMenu
-from .npie_helpers import get_all_def_files, get_prefs
+from .npie_def_file_index import get_all_def_files
+from .npie_helpers import get_prefs
 from .operators.op_check_missing_nodes import NPIE_OT_check_missing_nodes
 from .operators.op_generate_socket_types_file import NPIE_OT_generate_socket_types_file
+from .operators.op_profile_next_pie import NPIE_OT_profile_next_pie
 
 
 @BMenu("Node Pie Utilities")
@@ -28,6 +30,7 @@ class NPIE_MT_node_pie_utilities(BMenu.type):
         NPIE_OT_generate_socket_types_file.draw_button(layout)
         NPIE_OT_check_missing_nodes.draw_button(layout)
         NPIE_OT_alphabetise_nodes.draw_button(layout)
+        NPIE_OT_profile_next_pie.draw_button(layout)
 
 
 def context_menu_draw(self, context):
@@ -0,0 +1,89 @@
+"""Merge the node popularity files of many users into a single baseline file for a whole studio.
+This doesn't depend on Blender, so can be run with any python 3.10+ interpreter:
+
+    python -m node_pie.npie_merge_popularity path/to/popularity/files -o nodes_baseline.json
+
+Run from the folder that contains the node_pie package.
+
+Directories are searched recursively for .json files. Files are read one at a time,
+so memory use only depends on the number of different nodes, not the number of files.
+Files that can't be read are skipped and reported.
+The output has the same format as nodes.json, and can be set as the popularity baseline in the addon preferences."""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Iterator
+
+from .core.popularity import POPULARITY_FILE_VERSION, read_counts
+
+
+def iter_files(paths: list[Path]) -> Iterator[Path]:
+    for path in paths:
+        if path.is_dir():
+            yield from sorted(path.rglob("*.json"))
+        else:
+            yield path
+
+
+def merge_popularity_files(files: Iterator[Path], weighting: str = "user", scale: int = 1000):
+    """Merge the counts from each of the given files.
+
+    weighting: "user" gives each user an equal say for each node tree type, regardless of how many nodes they have added.
+        "raw" simply adds all of the counts together.
+    scale: The total count of each node tree for a single user, when using "user" weighting.
+
+    Returns the merged counts for each node tree type, and a list of the files that were skipped, with the reason."""
+    totals: dict[str, dict[str, float]] = {}
+    skipped = []
+    for path in files:
+        try:
+            counts = read_counts(path)
+        except ValueError as e:
+            skipped.append((path, str(e)))
+            continue
+
+        for tree_type, tree_counts in counts.items():
+            total = sum(tree_counts.values())
+            if not total:
+                continue
+            weight = scale / total if weighting == "user" else 1
+            merged = totals.setdefault(tree_type, {})
+            for node_id, count in tree_counts.items():
+                merged[node_id] = merged.get(node_id, 0) + count * weight
+
+    return totals, skipped
+
+
+def to_popularity_data(totals: dict[str, dict[str, float]]) -> dict:
+    """Convert merged counts to the format of the popularity file"""
+    node_trees = {}
+    for tree_type, counts in sorted(totals.items()):
+        nodes = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+        node_trees[tree_type] = {node_id: {"count": round(count)} for node_id, count in nodes if round(count)}
+    return {"version": list(POPULARITY_FILE_VERSION), "node_trees": node_trees}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("paths", type=Path, nargs="+", help="Popularity files, or directories containing them")
+    parser.add_argument("-o", "--output", type=Path, help="The file to write the baseline to (default: stdout)")
+    parser.add_argument("--weighting", choices=["user", "raw"], default="user")
+    parser.add_argument("--scale", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    totals, skipped = merge_popularity_files(iter_files(args.paths), args.weighting, args.scale)
+    for path, reason in skipped:
+        print(f"Skipped {path}: {reason}", file=sys.stderr)
+
+    data_str = json.dumps(to_popularity_data(totals), indent=4)
+    if args.output:
+        args.output.write_text(data_str, encoding="utf-8")
+    else:
+        print(data_str)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Find out which node types can be added to each node tree type.
+The only reliable way to do this is to try and create every node type, which is slow,
+so the results are cached to disk for each Blender version.
+Some nodes can only be added to the node trees of materials, worlds or scenes, and not to node groups,
+so the nodes are probed in the tree that is being edited where possible, and cached separately for each kind of tree."""
+
+import json
+from hashlib import sha1
+from inspect import isclass
+from pathlib import Path
+
+import bpy
+from bpy.types import Context, NodeTree
+
+from .npie_helpers import get_cache_dir
+from .npie_node_def_file import Separator, load_custom_nodes_info
+
+EXCLUDED_NODES = {
+    "FunctionNodeAlignEulerToVector",
+    "FunctionNodeRotateEuler",
+    "GeometryNodeRepeatInput",
+    "GeometryNodeForeachGeometryElementInput",
+    "GeometryNodeForeachGeometryElementOutput",
+    "GeometryNodeSimulationOutput",
+    "GeometryNodeSimulationInput",
+    "GeometryNodeRepeatOutput",
+    "GeometryNodeViewer",
+    "GeometryNodeGroup",
+    "NodeClosureInput",
+    "NodeClosureOutput",
+    "NodeGroupInput",
+    "NodeGroupOutput",
+    "ShaderNodeOutputLineStyle",
+    "ShaderNodeOutputWorld",
+    "ShaderNodeGroup",
+    "CompositorNodeGroup",
+    "CompositorNode",
+    "CompositorNodeCurveRGB",
+    "ShaderNode",
+    "GeometryNode",
+}
+
+
+def get_candidate_node_types() -> list[str]:
+    """Get the idnames of all registered node types that could be in the pie, without creating any nodes."""
+    idnames = set()
+    for name in dir(bpy.types):
+        bpy_type = getattr(bpy.types, name, None)
+        if not isclass(bpy_type) or not issubclass(bpy_type, bpy.types.Node):
+            continue
+        identifier = bpy_type.bl_rna.identifier
+        if identifier in EXCLUDED_NODES or "legacy" in bpy_type.bl_rna.name.lower():
+            continue
+        idnames.add(identifier)
+    return sorted(idnames)
+
+
+def get_probe_key(node_tree: NodeTree) -> str:
+    """Node groups can't contain some of the nodes that the trees of materials, worlds and scenes can"""
+    return f"{node_tree.bl_rna.identifier}:{'embedded' if node_tree.is_embedded_data else 'group'}"
+
+
+def probe_node_types(node_tree: NodeTree, idnames: list[str]) -> list[str]:
+    """Try to create each of the given node types in the given node tree, and return the ones that succeed.
+    The nodes are removed again straight away, so the tree is left unchanged."""
+    available = []
+    for idname in idnames:
+        try:
+            node = node_tree.nodes.new(idname)
+        except RuntimeError:
+            continue
+        node_tree.nodes.remove(node)
+        available.append(idname)
+    return available
+
+
+class NodeAvailabilityCache:
+    """The node types that are available in each node tree type, stored on disk for this Blender version.
+    The cache is invalidated if the set of registered node types changes, e.g. when an addon is enabled."""
+
+    def __init__(self):
+        self.signature = ""
+        self.tree_types: dict[str, frozenset[str]] = {}
+        self.loaded = False
+
+    @property
+    def path(self) -> Path:
+        version_str = "_".join(str(i) for i in bpy.app.version)
+        return get_cache_dir() / f"available_nodes_{version_str}.json"
+
+    def load(self, signature: str):
+        self.loaded = True
+        self.signature = signature
+        self.tree_types = {}
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text())
+        except json.JSONDecodeError:
+            return
+        if data.get("signature") == signature:
+            self.tree_types = {k: frozenset(v) for k, v in data.get("tree_types", {}).items()}
+
+    def save(self):
+        data = {
+            "signature": self.signature,
+            "tree_types": {k: sorted(v) for k, v in self.tree_types.items()},
+        }
+        self.path.write_text(json.dumps(data, indent=2))
+
+    def get_available_nodes(self, node_tree: NodeTree) -> frozenset[str]:
+        """Get the idnames of all nodes that can be added to the given kind of node tree"""
+        candidates = get_candidate_node_types()
+        signature = sha1("\n".join(candidates).encode()).hexdigest()
+        if not self.loaded or signature != self.signature:
+            self.load(signature)
+
+        key = get_probe_key(node_tree)
+        if (available := self.tree_types.get(key)) is None:
+            available = frozenset(probe_node_types(node_tree, candidates))
+            self.tree_types[key] = available
+            self.save()
+        return available
+
+
+node_availability_cache = NodeAvailabilityCache()
+
+
+def get_pie_node_types(context: Context, tree_type: str) -> set[str]:
+    """Get the idnames of all nodes in the definition files for the given node tree type"""
+    categories, layout = load_custom_nodes_info(tree_type, context)
+    nodes = set()
+    for cat in categories.values():
+        for node in cat.nodes:
+            if isinstance(node, Separator):
+                continue
+            nodes.add(node.idname)
+    return nodes
+
+
+def get_missing_nodes_report(context: Context, tree_type: str, node_tree: NodeTree = None) -> dict[str, list[str]]:
+    """Compare the nodes in the pie with the nodes that can be added to the given node tree type.
+    `missing` nodes can be added but aren't in the pie, `unused` nodes are in the pie but can't be added.
+
+    If no node tree is given, the nodes are probed in a temporary node group instead. Pie nodes that can't be added to
+    it are reported as `unknown` rather than `unused`, as they could still be valid in a material, world or scene."""
+    pie_nodes = get_pie_node_types(context, tree_type)
+    if node_tree:
+        available = node_availability_cache.get_available_nodes(node_tree)
+        return {
+            "missing": sorted(available - pie_nodes),
+            "unused": sorted(pie_nodes - available),
+            "unknown": [],
+        }
+
+    node_tree = bpy.data.node_groups.new(".npie_probe", tree_type)
+    try:
+        available = node_availability_cache.get_available_nodes(node_tree)
+    finally:
+        bpy.data.node_groups.remove(node_tree)
+    return {
+        "missing": sorted(available - pie_nodes),
+        "unused": [],
+        "unknown": sorted(pie_nodes - available),
+    }
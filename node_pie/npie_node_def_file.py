@@ -1,23 +1,24 @@
-import json
 from dataclasses import dataclass, field
-from pathlib import Path
+from sys import intern
 from typing import Any
 
 import bpy
 from bpy.types import Context
 
-from .npie_constants import NODE_DEF_BUILTIN, NODE_DEF_USER
-from .npie_helpers import (
-    JSONWithCommentsDecoder,
-    NpieCache,
-    get_all_def_files,
-    get_all_node_types,
-)
+from .core.definitions import get_merge_keys, merge_def_files
+from .core.popularity import get_popularity_id
+from .core.search import SearchEntry, SearchIndex
+from .npie_def_file_index import DefFileEntry, def_file_index
+from .npie_generate_def_file import get_generated_def_file
+from .npie_helpers import NpieCache, get_all_node_types
+from .npie_timings import timings
 
 
 class PollCondition:
     """Represents a condition that can be evaluated to determine whether to show a node or not."""
 
+    __slots__ = ("context_path", "operand", "value")
+
     def __init__(self, context_path: str, operand: str, value: Any = None):
         supported_operands = {"bool", "equals", "in", "not_equals"}
         if operand not in supported_operands:
@@ -45,7 +46,12 @@ class PollCondition:
         return False
 
 
-@dataclass
+# The definition classes are slotted and frozen, as there can be thousands of them cached for each node tree type.
+# Strings that are repeated many times (idnames, colors etc.) are interned, and identical settings dicts are shared.
+# Because of this, the settings and variants of an item should never be modified.
+
+
+@dataclass(slots=True, frozen=True)
 class NodeItem:
     """An imitator of the built in blender NodeItem class, that implements the necessary settings"""
 
@@ -53,11 +59,12 @@ class NodeItem:
     idname: str
     settings: dict = field(default_factory=dict)
     variants: dict = field(default_factory=dict)
-    poll_conditions: list[PollCondition] = field(default_factory=list)
+    poll_conditions: tuple[PollCondition, ...] = ()
     max_len: int = 100
     color: str = ""
     description: str = ""
-    category = None
+    # Set once the category has been created, see `set_category`
+    category: "NodeCategory" = field(default=None, compare=False, repr=False)
 
     def poll(self, context: Context):
         if not self.poll_conditions:
@@ -67,18 +74,23 @@ class NodeItem:
                 return True
         return False
 
+    def set_category(self, category: "NodeCategory"):
+        # The category contains the item, so can only be set after the item has been created
+        object.__setattr__(self, "category", category)
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class NodeCategory:
     """An imitator of the built in blender NodeCategory class, that implements the necessary settings"""
 
     label: str
-    nodes: list[NodeItem]
+    nodes: tuple[NodeItem, ...]
     color: str
     icon: str = ""
     children: list = None
     idname: str = ""
-    poll_conditions: list[PollCondition] = field(default_factory=list)
+    poll_conditions: tuple[PollCondition, ...] = ()
+    max_items: int = -1
 
     poll = NodeItem.poll
     # def poll(self, context: Context):
@@ -93,15 +105,15 @@ class NodeCategory:
         return self.nodes
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Separator:
     label: str = ""
-    poll_conditions: list[PollCondition] = field(default_factory=list)
+    poll_conditions: tuple[PollCondition, ...] = ()
 
     poll = NodeItem.poll
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class NodeOperator:
     idname: str
     label: str = ""
@@ -109,195 +121,75 @@ class NodeOperator:
     color: str = ""
 
 
-def create_defaults(data: dict):
-    # Add default values in case they are missing from the file
-    default_layout = {"top": [[]], "bottom": [[]], "left": [[]], "right": [[]]}
-    data["layout"] = data.get("layout", default_layout)
-    default_layout.update(data["layout"])
-    data["layout"] = default_layout
-    data["poll_types"] = data.get("poll_types", {})
-    data["categories"] = data.get("categories", {})
-    return data
-
-
-def merge_configs(base: dict, additions: dict, removals: dict = {}):
-    # Add default values in case they are missing from the file
-    base = create_defaults(base)
-    additions = create_defaults(additions)
-    removals = create_defaults(removals)
-
-    # REMOVALS
-    # Process layout removals
-    orig_layout = base["layout"]
-    remove_layout = removals["layout"]
-    for area_name, rem_area in remove_layout.items():
-        for orig_column, rem_column in zip(orig_layout[area_name], rem_area):
-            for cat_id in rem_column:
-                orig_column.remove(cat_id)
-
-    # Process category removals
-    orig_categories = base["categories"]
-    remove_categories = removals["categories"]
-    for rem_cat_name, rem_cat in remove_categories.items():
-        if nodes := rem_cat.get("nodes", []):
-            orig_nodes = orig_categories[rem_cat_name]["nodes"]
-            for rem_node in nodes:
-                for i, orig_node in enumerate(orig_nodes.copy()):
-                    if rem_node.get("separator") or orig_node.get("separator"):
-                        continue
-                    if rem_node["identifier"] == orig_node["identifier"]:
-                        orig_nodes.remove(orig_node)
-                        break
-            pass
-        else:
-            del orig_categories[rem_cat_name]
-
-    # Process full node removals
-    remove_nodes = removals.get("nodes", [])
-    for rem_node in remove_nodes:
-        for orig_category in orig_categories.values():
-            for orig_node in orig_category["nodes"].copy():
-                if rem_node == orig_node.get("identifier"):
-                    orig_category["nodes"].remove(orig_node)
-                    break
-
-    # ADDITIONS
-    # Merge layout
-    for orig_area_name, orig_columns in base["layout"].items():
-        new_columns = additions["layout"].get(orig_area_name)
-        if not new_columns:
-            continue
-        for i, new_column in enumerate(new_columns):
-            new_column = new_column.copy()
-            for new_row in new_column:
-                orig_columns = base["layout"][orig_area_name]
-                if i > len(orig_columns) - 1:
-                    orig_columns.append([new_row])
-                else:
-                    orig_columns[i].append(new_row)
-
-    # Merge poll types
-    poll_types: dict = base["poll_types"]
-    poll_types.update(additions["poll_types"])
-
-    # Merge in the new nodes
-    for orig_cat_name, orig_cat in base["categories"].items():
-        new_cat = additions["categories"].get(orig_cat_name)
-        if new_cat:
-            # Insert the node after the specified one.
-            idx = -1
-            for new_node in new_cat["nodes"]:
-                if name := new_node.get("after_node"):
-                    if name == "top":
-                        idx = 0
-                    elif name == "bottom":
-                        idx = -1
-                    else:
-                        names = [n.get("identifier") for n in orig_cat["nodes"]]
-                        idx = names.index(name) + 1
-                elif name := new_node.get("before_node"):
-                    names = [n.get("identifier") for n in orig_cat["nodes"]]
-                    idx = names.index(name)
-
-                if idx == -1:
-                    orig_cat["nodes"].append(new_node)
-                else:
-                    orig_cat["nodes"].insert(idx, new_node)
-
-    # Add new categories
-    new_cats = additions["categories"].keys() - base["categories"].keys()
-    for new_cat in new_cats:
-        base["categories"][new_cat] = additions["categories"][new_cat]
-    return base
+modified_times = {}
 
+# The search index of each tree type, along with the hashes of the definition files it was built from
+search_indices: dict[str, tuple[tuple[str, ...], SearchIndex]] = {}
+
+
+def get_search_entries(categories: dict[str, NodeCategory]) -> list[SearchEntry]:
+    """Get a search entry for every node, variant and operator in the given categories.
+    Nodes that are in more than one category are only included once."""
+    entries = {}
+
+    def add(label: str, idname: str, settings: dict, category: NodeCategory, item, is_operator=False):
+        if label not in entries:
+            popularity_id = "" if is_operator else get_popularity_id(idname, settings)
+            entries[label] = SearchEntry(label, idname, settings, category.label, popularity_id, "", is_operator, item)
+
+    for category in categories.values():
+        for item in category.nodes:
+            if isinstance(item, NodeOperator):
+                add(item.label, item.idname, item.settings, category, item, is_operator=True)
+            elif isinstance(item, NodeItem):
+                add(item.label, item.idname, item.settings, category, item)
+                for name, variant in item.variants.items():
+                    if name != "separator":
+                        add(f"{item.label} > {name}", item.idname, variant, category, item)
+    return list(entries.values())
 
-modified_times = {}
 
+def get_search_index(tree_type: str) -> SearchIndex | None:
+    """Get the search index built the last time the definitions for the given tree type were loaded"""
+    if cached := search_indices.get(tree_type):
+        return cached[1]
+    return None
 
+
+@timings.timed("load_custom_nodes_info")
 def load_custom_nodes_info(tree_identifier: str, context) -> tuple[dict[str, NodeCategory], dict]:
+    tree_type = tree_identifier
     categories = {}
     layout = {}
 
-    all_files = get_all_def_files()
+    def_file_index.refresh()
 
     # Different render engines can use different nodes in the default shader editor, account for that.
     if tree_identifier == "ShaderNodeTree":
-        for file in all_files:
-            with open(file, "r") as f:
-                data = json.load(f, cls=JSONWithCommentsDecoder)
-            if data.get("render_engine") == context.scene.render.engine:
-                tree_identifier = file.name
-                break
+        if entry := def_file_index.get_render_engine_file(context.scene.render.engine):
+            tree_identifier = entry.name
+        # Auto generate if not blender render engine
+        elif context.scene.render.engine not in {
+            "BLENDER_EEVEE",
+            "BLENDER_EEVEE_NEXT",
+            "CYCLES",
+            "BLENDER_WORKBENCH",
+        }:
+            return {}, {}
+
+    # Get files, sorted from first version to latest version so that they are applied in the correct order
+    entries = def_file_index.get_tree_files(tree_identifier)
+    if errors := def_file_index.get_tree_errors(tree_identifier):
+        raise ValueError("Could not read definition files:\n" + "\n".join(errors))
+
+    if not entries:
+        # Generate a definition file for node trees that don't have one, so that they can be loaded in the same way
+        if generated_file := get_generated_def_file(context, tree_identifier):
+            entries = [DefFileEntry.from_file(generated_file, generated_file.stat())]
         else:
-            # Auto generate if not blender render engine
-            if context.scene.render.engine not in {
-                "BLENDER_EEVEE",
-                "BLENDER_EEVEE_NEXT",
-                "CYCLES",
-                "BLENDER_WORKBENCH",
-            }:
-                return {}, {}
-
-    def get_def_files(dir: Path) -> Path:
-        files = []
-        for file in dir.rglob("*"):
-            if file.is_file() and file.suffix == ".jsonc" and file.name.startswith(f"{tree_identifier}"):
-                files.append(file)
-        return files
-
-    # Get files
-    files = get_def_files(NODE_DEF_USER)
-    names = {f.name for f in files}
-    files += [f for f in get_def_files(NODE_DEF_BUILTIN) if f.name not in names]
-
-    if not files:
-        return {}, {}
-
-    # Sort the files from first version to latest version so that they are applied in the correct order
-    def sort(f):
-        with open(f, "r") as file:
-            fdata = json.load(file, cls=JSONWithCommentsDecoder)
-
-            # TODO: REMOVE
-            if fdata.get("apply_after", False):
-                return [9, 9, 9]
-
-            return fdata.get("blender_version", [0, 0, 0])
-
-    files.sort(key=sort)
-
-    with open(files[0], "r") as f:
-        data = json.load(f, cls=JSONWithCommentsDecoder)
-
-    # Merge in imports
-    if imports := data.get("imports"):
-        for import_name in imports:
-            for file in all_files:
-                if file.stem == import_name:
-                    with open(file, "r") as f:
-                        new_data = json.load(f, cls=JSONWithCommentsDecoder)
-                    merge_configs(data, new_data)
-                    break
-            else:
-                raise ValueError(f"file {import_name}.jsonc not found")
-
-    # Merge in nodes from newer versions
-    for file in files:
-        with open(file, "r") as f:
-            new_data = json.load(f, cls=JSONWithCommentsDecoder)
-
-        if tuple(new_data.get("blender_version", [0, 0, 0])) > bpy.app.version or not new_data.get("enable", True):
-            continue
-
-        # check for resetting
-        # Happens if there is a major change to nodes in an update
-        reset_all = new_data.get("reset_all", False)
-        if new_data.get("reset_layout", False) or reset_all:
-            data["layout"] = {"left": [], "right": [], "top": [], "bottom": []}
-        if reset_all:
-            data["categories"] = {}
-
-        merge_configs(data, new_data.get("additions", {}), new_data.get("removals", {}))
+            return {}, {}
+
+    data = merge_def_files(def_file_index, tree_identifier, entries, bpy.app.version)
 
     layout = data["layout"]
     poll_types = data.get("poll_types", {})
@@ -307,27 +199,38 @@ def load_custom_nodes_info(tree_identifier: str, context) -> tuple[dict[str, Nod
 
     not_found = []
 
+    # Share identical settings dicts between items, as many items have the same or no settings
+    shared_settings = {}
+
+    def share(settings: dict) -> dict:
+        # Keep the original order, as settings are applied in order and later ones can depend on earlier ones
+        try:
+            key = tuple(settings.items())
+            hash(key)
+        except TypeError:
+            # Unhashable values such as lists can't be shared
+            return settings
+        return shared_settings.setdefault(key, settings)
+
     for cat_idname, cat in data["categories"].items():
         items = []
         for node in cat["nodes"]:
 
             # Create poll conditions
-            poll_conditions = []
             if poll_type := node.get("poll_type"):
                 conditions = node.get("poll_conditions", [])
                 node["poll_conditions"] = poll_types[poll_type] + conditions
-            for condition in node.get("poll_conditions", []):
-                poll_conditions.append(PollCondition(**condition))
+            poll_conditions = tuple(PollCondition(**condition) for condition in node.get("poll_conditions", []))
 
             if node.get("separator"):
-                items.append(Separator(label=node.get("label", ""), poll_conditions=poll_conditions))
+                items.append(Separator(label=intern(node.get("label", "")), poll_conditions=poll_conditions))
                 continue
             if node.get("operator"):
                 items.append(
                     NodeOperator(
-                        node["operator"],
-                        label=node.get("label", ""),
-                        settings=node.get("settings", {}),
+                        intern(node["operator"]),
+                        label=intern(node.get("label", "")),
+                        settings=share(node.get("settings", {})),
                     )
                 )
                 continue
@@ -344,42 +247,51 @@ def load_custom_nodes_info(tree_identifier: str, context) -> tuple[dict[str, Nod
                 not_found.append(idname)
                 continue
             description = bl_node.bl_rna.description if bl_node else ""
+            settings = share(node.get("settings", {}))
+
+            variants: dict[str, dict] = {}
+            for name, variant in node.get("variants", {}).items():
+                if name != "separator":
+                    # Variants that don't change anything can use the same settings as the base node
+                    variant = share({**settings, **variant}) if variant else settings
+                variants[intern(name)] = variant
+
             item = NodeItem(
-                label,
-                idname,
-                color=node.get("color", ""),
-                description=description,
+                intern(label),
+                intern(idname),
+                settings=settings,
+                variants=variants,
+                poll_conditions=poll_conditions,
+                color=intern(node.get("color", "")),
+                description=intern(description),
                 max_len=node.get("max_len", 100),
             )
-            item.settings = node.get("settings", {})
-            item.variants: dict[str, dict] = node.get("variants", {})
-            item.poll_conditions = poll_conditions
-
-            for name, variant in item.variants.items():
-                if name != "separator":
-                    all_settings = item.settings.copy()
-                    all_settings.update(variant)
-                    item.variants[name] = all_settings
             items.append(item)
 
         if not cat.get("label"):
             raise ValueError(f"No label found for category '{cat_idname}'")
         category = NodeCategory(
-            cat["label"],
-            items,
-            color=cat.get("color", ""),
-            idname=cat_idname,
-            icon=cat.get("icon", ""),
+            intern(cat["label"]),
+            tuple(items),
+            color=intern(cat.get("color", "")),
+            idname=intern(cat_idname),
+            icon=intern(cat.get("icon", "")),
+            poll_conditions=tuple(PollCondition(**condition) for condition in cat.get("poll_conditions", {})),
+            max_items=cat.get("max_items", -1),
         )
-        for condition in cat.get("poll_conditions", {}):
-            category.poll_conditions.append(PollCondition(**condition))
         categories[cat_idname] = category
         for nodeitem in category.nodes:
-            nodeitem.category = category
+            if isinstance(nodeitem, NodeItem):
+                nodeitem.set_category(category)
 
     if not_found:
         raise ValueError(f"No label found for node(s) '{not_found}'")
 
+    # Only rebuild the search index when the merged definitions have changed, including any imported files
+    key = get_merge_keys(def_file_index, entries, bpy.app.version)[2][-1]
+    if (cached := search_indices.get(tree_type)) is None or cached[0] != key:
+        search_indices[tree_type] = (key, SearchIndex(get_search_entries(categories)))
+
     NpieCache.categories = categories
     NpieCache.layout = layout
     return categories, layout
@@ -0,0 +1,150 @@
+import bpy
+from bpy.app.handlers import persistent
+from bpy.types import NodeTree
+
+
+class NodeGroupGraph:
+    """A cached graph of which node groups are used inside which other node groups.
+    It is rebuilt lazily the first time it is needed after the blend data has changed.
+    Groups that aren't evaluated by the depsgraph don't report their updates, so the number of nodes in each group
+    is also checked before it is used, which catches group nodes being added or removed anywhere."""
+
+    def __init__(self):
+        self.dirty = True
+        # The pointer and number of nodes of each node group when the graph was built
+        self.signature: tuple[tuple[int, int], ...] = ()
+        # Maps the name of each node group to the names of the node trees that directly contain it
+        self.users: dict[str, set[str]] = {}
+        # The memoized transitive users of each node tree
+        self.ancestors: dict[str, frozenset[str]] = {}
+
+    def tag_dirty(self):
+        self.dirty = True
+
+    def rebuild(self):
+        users: dict[str, set[str]] = {}
+        for ng in bpy.data.node_groups:
+            for node in ng.nodes:
+                sub_tree = getattr(node, "node_tree", None)
+                if sub_tree:
+                    users.setdefault(sub_tree.name_full, set()).add(ng.name_full)
+        self.users = users
+        self.ancestors = {}
+        self.signature = self.get_signature()
+        self.dirty = False
+
+    def get_signature(self) -> tuple[tuple[int, int], ...]:
+        return tuple((ng.as_pointer(), len(ng.nodes)) for ng in bpy.data.node_groups)
+
+    def get_ancestors(self, node_tree: NodeTree) -> frozenset[str]:
+        """Get the names of the given node tree and all node groups that contain it, however deeply nested.
+        Adding any of these groups to the node tree would cause recursion."""
+        if self.dirty or self.signature != self.get_signature():
+            self.rebuild()
+
+        name = node_tree.name_full
+        if name in self.ancestors:
+            return self.ancestors[name]
+
+        ancestors = {name}
+        to_check = [name]
+        while to_check:
+            for user in self.users.get(to_check.pop(), ()):
+                if user not in ancestors:
+                    ancestors.add(user)
+                    to_check.append(user)
+
+        ancestors = frozenset(ancestors)
+        self.ancestors[name] = ancestors
+        return ancestors
+
+
+node_group_graph = NodeGroupGraph()
+
+
+def get_interface_key(node_group: NodeTree) -> tuple[tuple[str, str], ...]:
+    """Get a hashable representation of the socket types in the interface of a node group"""
+    return tuple(
+        (item.in_out, item.socket_type) for item in node_group.interface.items_tree if item.item_type == "SOCKET"
+    )
+
+
+class NodeGroupSocketCache:
+    """A cache of the input and output socket types of node groups, derived from their interfaces.
+    Groups with identical interfaces share the same socket data. The interface of a group is checked every time,
+    as groups that aren't evaluated by the depsgraph don't report their updates, but that only needs a short walk
+    of its items rather than creating any sockets."""
+
+    def __init__(self):
+        # Maps an interface key to the socket data for that interface
+        self.by_interface: dict[tuple, dict[str, frozenset[str]]] = {}
+        # Maps the pointer of each node group to the interface key it had when it was last checked,
+        # so that interfaces which are no longer used by any group can be removed.
+        self.by_group: dict[int, tuple] = {}
+
+    def get_socket_info(self, node_group: NodeTree) -> dict[str, frozenset[str]]:
+        """Get the input and output socket types of the given node group,
+        in the same format as the socket types files."""
+        key = get_interface_key(node_group)
+        socket_data = self.by_interface.get(key)
+        if socket_data is None:
+            socket_data = {
+                "inputs": frozenset(socket_type for in_out, socket_type in key if in_out == "INPUT"),
+                "outputs": frozenset(socket_type for in_out, socket_type in key if in_out == "OUTPUT"),
+            }
+            self.by_interface[key] = socket_data
+
+        pointer = node_group.as_pointer()
+        old_key = self.by_group.get(pointer)
+        self.by_group[pointer] = key
+        # The interface of this group has changed, so its old one might not be used any more
+        if old_key is not None and old_key != key:
+            self.prune()
+        return socket_data
+
+    def prune(self):
+        """Remove the groups that no longer exist, and the interfaces that aren't used by any group"""
+        pointers = {ng.as_pointer() for ng in bpy.data.node_groups}
+        self.by_group = {pointer: key for pointer, key in self.by_group.items() if pointer in pointers}
+        used = set(self.by_group.values())
+        self.by_interface = {key: data for key, data in self.by_interface.items() if key in used}
+
+    def clear(self):
+        self.by_interface.clear()
+        self.by_group.clear()
+
+
+node_group_socket_cache = NodeGroupSocketCache()
+
+
+@persistent
+def depsgraph_update_handler(scene, depsgraph):
+    if depsgraph.id_type_updated("NODETREE"):
+        node_group_graph.tag_dirty()
+
+
+@persistent
+def data_changed_handler(*args):
+    node_group_graph.tag_dirty()
+    node_group_socket_cache.clear()
+
+
+def get_handlers():
+    handlers = bpy.app.handlers
+    return [
+        (handlers.depsgraph_update_post, depsgraph_update_handler),
+        (handlers.load_post, data_changed_handler),
+        (handlers.undo_post, data_changed_handler),
+        (handlers.redo_post, data_changed_handler),
+    ]
+
+
+def register():
+    for handler_list, handler in get_handlers():
+        handler_list.append(handler)
+
+
+def unregister():
+    for handler_list, handler in get_handlers():
+        if handler in handler_list:
+            handler_list.remove(handler)
@@ -1,10 +1,11 @@
-import json
-
 import bpy
+from bpy.types import Node
 
+from .core import sockets
+from .core.sockets import SocketTypeIndex, get_socket_family, load_socket_data
 from .npie_constants import NODE_DEF_SOCKETS
-from .npie_helpers import JSONWithCommentsDecoder
 from .npie_node_def_file import NodeItem
+from .npie_timings import timings
 
 # Convert from node socket types to node enum names
 # Switch and compare nodes have special cases that need to be dealt with individually
@@ -55,9 +56,6 @@ COMPARE_TYPES = add_socket_names(COMPARE_TYPES)
 ALL_TYPES = add_socket_names(ALL_TYPES)
 COMPOSITOR_TYPES = add_socket_names(COMPOSITOR_TYPES)
 
-EXCLUSIVE_SOCKETS = {"Material", "Object", "Collection", "Geometry", "Shader", "String", "Image", "Texture"}
-EXCLUSIVE_SOCKETS = {"NodeSocket" + s for s in EXCLUSIVE_SOCKETS}
-
 # Convert between standard data type identifiers and the specific socket types used for capture attribute node
 CAPTURE_ATTRIBUTE_SOCKETS = {
     "INT": "INT",
@@ -66,30 +64,56 @@ CAPTURE_ATTRIBUTE_SOCKETS = {
     "BOOLEAN": "BOOLEAN",
 }
 
+# Filled in the first time each node type is encountered
+node_data_types: dict[str, frozenset[str]] = {}
+
+
+def get_node_data_types(node: Node) -> frozenset[str]:
+    """Get the data types that can be set on the given node.
+    This is empty for nodes whose data type items are generated dynamically."""
+    idname = node.bl_idname
+    if idname not in node_data_types:
+        prop = node.bl_rna.properties.get("data_type")
+        items = prop.enum_items if prop and prop.type == "ENUM" else []
+        node_data_types[idname] = frozenset(item.identifier for item in items)
+    return node_data_types[idname]
+
+
+def get_socket_compatibility(from_idname: str, to_idname: str) -> int:
+    """Get a score for how well two socket types match, see `core.sockets.get_socket_compatibility`"""
+    return sockets.get_socket_compatibility(from_idname, to_idname, ALL_TYPES)
+
+
+def get_connectable_types(from_socket_type: str) -> set[str]:
+    """Get the socket types that a socket of the given type can be connected to."""
+    return sockets.get_connectable_types(from_socket_type, ALL_TYPES)
+
+
+def is_socket_type_valid(from_socket_type: str, from_socket_is_output: bool, node_socket_data: dict) -> bool:
+    """Check if the given socket type can be connected to any of the sockets in the given socket data."""
+    return sockets.is_socket_type_valid(from_socket_type, from_socket_is_output, node_socket_data, ALL_TYPES)
+
+
 def is_socket_to_node_valid(from_socket_type: str, from_socket_is_output: bool, to_node: NodeItem, socket_data: dict):
     """Check if the given socket type has any valid connections to the given node."""
-    in_out = "inputs" if from_socket_is_output else "outputs"
-    valid_types = (
-        {from_socket_type} if from_socket_type in EXCLUSIVE_SOCKETS else set(ALL_TYPES.keys()) - EXCLUSIVE_SOCKETS
-    )
     node_socket_data = socket_data.get(to_node.idname)
     if not node_socket_data:
         print(f"Socket data not defined for node {to_node.idname}")
         return True
-    if any(t in socket_data[to_node.idname][in_out] for t in valid_types):
-        return True
-    return False
+    return is_socket_type_valid(from_socket_type, from_socket_is_output, node_socket_data)
 
 
+@timings.timed("get_node_socket_info")
 def get_node_socket_info(tree_type: str, max_bl_version=bpy.app.version):
     """Return a dictionary of nodes and their socket types"""
-    sockets_files = NODE_DEF_SOCKETS.rglob(f"**/{tree_type}*.jsonc")
-    sockets_files_data = [json.loads(f.read_text(), cls=JSONWithCommentsDecoder) for f in sockets_files]
-    sockets_files_data.sort(key=lambda data: data["bl_version"])
+    return load_socket_data(NODE_DEF_SOCKETS, tree_type, max_bl_version)
+
+
+socket_type_indices: dict[str, SocketTypeIndex] = {}
 
-    all_socket_data = {}
-    for data in sockets_files_data:
-        if tuple(data["bl_version"]) <= tuple(max_bl_version):
-            all_socket_data.update(data["nodes"])
 
-    return all_socket_data
+def get_socket_type_index(tree_type: str) -> SocketTypeIndex:
+    """Get the cached socket type index for the given node tree type"""
+    if tree_type not in socket_type_indices:
+        socket_type_indices[tree_type] = SocketTypeIndex(get_node_socket_info(tree_type), ALL_TYPES)
+    return socket_type_indices[tree_type]
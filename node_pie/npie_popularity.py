@@ -0,0 +1,104 @@
+"""Storage for the number of times each node has been added, which is used to decide how big to draw it in the pie.
+The default store is a JSON file, but an SQLite database can be used instead,
+which is safe to update from multiple Blender instances at the same time.
+A studio wide baseline can also be layered underneath the local counts, see `npie_merge_popularity.py`"""
+
+from pathlib import Path
+
+import bpy
+from bpy.types import Context, NodeSocket
+
+from .core.popularity import JSONPopularityStore, SQLitePopularityStore, layer_counts, read_counts
+from .core.recent import RecentNodes
+from .core.sockets import get_socket_family
+from .core.transitions import TransitionCounts
+from .npie_constants import (
+    POPULARITY_BASELINE_FILE,
+    POPULARITY_DB_FILE,
+    POPULARITY_FILE,
+    POPULARITY_RECENT_FILE,
+    POPULARITY_TRANSITIONS_FILE,
+)
+from .npie_helpers import get_prefs
+from .npie_node_info import ALL_TYPES
+
+
+json_store = JSONPopularityStore(POPULARITY_FILE)
+sqlite_store = SQLitePopularityStore(POPULARITY_DB_FILE, json_store)
+# Kept in memory once loaded, so that drawing the recent nodes doesn't need to read the file
+recent_nodes = RecentNodes(POPULARITY_RECENT_FILE)
+transition_counts = TransitionCounts(POPULARITY_TRANSITIONS_FILE)
+
+
+def get_popularity_store(context: Context) -> JSONPopularityStore | SQLitePopularityStore:
+    """Get the popularity store selected in the preferences"""
+    if get_prefs(context).npie_popularity_backend == "SQLITE":
+        return sqlite_store
+    return json_store
+
+
+def get_transition_key(socket: NodeSocket) -> str:
+    """Get the key of the transition counts for a link dragged from the given socket.
+    Subtypes of the same socket type share a key, e.g. float factor and float distance sockets."""
+    socket_type = get_socket_family(socket.bl_idname, ALL_TYPES) or socket.bl_idname
+    return transition_counts.get_key(socket.node.bl_idname, socket_type, socket.is_output)
+
+
+def get_baseline_file(context: Context) -> Path | None:
+    """Get the studio baseline popularity file, either from the preferences or next to the addon"""
+    if path := get_prefs(context).npie_popularity_baseline:
+        path = Path(bpy.path.abspath(path))
+    else:
+        path = POPULARITY_BASELINE_FILE
+    return path if path.is_file() else None
+
+
+# The baseline counts for each tree type, along with the path and modification time of the file they were loaded from
+_baseline: tuple[tuple, dict[str, dict[str, int]]] = ((), {})
+
+
+def get_baseline_counts(context: Context, tree_type: str) -> dict[str, int]:
+    global _baseline
+    path = get_baseline_file(context)
+    key = (path, path.stat().st_mtime_ns) if path else ()
+    if key != _baseline[0]:
+        counts = {}
+        if path:
+            try:
+                counts = read_counts(path)
+            except ValueError as e:
+                print(f"Node Pie: Couldn't read popularity baseline file {path}: {e}")
+        _baseline = (key, counts)
+    return _baseline[1].get(tree_type, {})
+
+
+# The layered counts for each tree type, along with the versions of the sources they were computed from
+_layered_counts: dict[str, tuple[tuple, dict[str, float]]] = {}
+
+
+def get_layered_counts_version(context: Context) -> tuple:
+    """Get a value that changes whenever the layered counts could have changed. This is the type and version of the
+    popularity store, and the path and modification time of the baseline file."""
+    store = get_popularity_store(context)
+    path = get_baseline_file(context)
+    baseline_key = (path, path.stat().st_mtime_ns) if path else ()
+    return (type(store).__name__, store.get_version(), baseline_key)
+
+
+def get_layered_counts(context: Context, tree_type: str) -> dict[str, float]:
+    """Get the popularity of each node in the given tree type, with the studio baseline layered underneath.
+    This is only recomputed when the local counts or the baseline changes, rather than on every draw."""
+    store = get_popularity_store(context)
+    baseline = get_baseline_counts(context, tree_type)
+    key = get_layered_counts_version(context)
+    cached = _layered_counts.get(tree_type)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    counts = layer_counts(store.get_counts(tree_type), baseline)
+    _layered_counts[tree_type] = (key, counts)
+    return counts
+
+
+def unregister():
+    sqlite_store.close()
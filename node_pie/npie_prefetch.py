@@ -0,0 +1,118 @@
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Iterator
+
+from bpy.types import Context, NodeSocket
+
+from .npie_helpers import get_prefs
+from .npie_node_def_file import NodeCategory, NodeItem, load_custom_nodes_info
+from .npie_node_info import get_node_socket_info, is_socket_to_node_valid
+from .npie_popularity import get_transition_key, transition_counts
+from .npie_ui import get_all_nodes, get_node_counts, get_node_sizes, get_suggested_nodes
+
+# The maximum amount of time to spend prefetching in each modal step, in seconds
+STEP_TIME = 0.004
+
+# The number of nodes to check for validity between each time check
+CHUNK_SIZE = 32
+
+
+@dataclass
+class PiePrefetch:
+    """The data needed to draw the pie for a specific socket, computed ahead of time during link drag."""
+
+    tree_type: str
+    socket_type: str
+    is_output: bool
+
+    categories: dict[str, NodeCategory] = field(default_factory=dict)
+    layout: dict = field(default_factory=dict)
+    all_nodes: dict[str, NodeItem] = field(default_factory=dict)
+    variant_nodes: dict[str, tuple[NodeItem, str]] = field(default_factory=dict)
+
+    # Whether each node idname can be connected to the socket
+    valid_nodes: dict[str, bool] = field(default_factory=dict)
+    # The button size of each node popularity id
+    node_sizes: dict[str, float] = field(default_factory=dict)
+    # The nodes most often added from this kind of socket with their counts, and the items in the pie for them
+    suggestions: list[tuple[str, int]] = field(default_factory=list)
+    suggested_nodes: list[tuple[NodeItem, str, str, str]] = field(default_factory=list)
+
+    finished: bool = False
+
+    def matches(self, tree_type: str, socket: NodeSocket) -> bool:
+        """Whether this data was computed for the given tree type and socket"""
+        if not self.finished or not socket:
+            return False
+        return (tree_type, socket.bl_idname, socket.is_output) == (self.tree_type, self.socket_type, self.is_output)
+
+
+def get_idname(node_item) -> str:
+    """Get the node type of either a node pie or a builtin blender node item"""
+    return node_item.nodetype if hasattr(node_item, "nodetype") else node_item.idname
+
+
+class LinkDragPrefetcher:
+    """Computes the pie data for a socket in small time slices, so that it can run while the user is dragging."""
+
+    def __init__(self, context: Context, socket: NodeSocket):
+        self.data = PiePrefetch(
+            tree_type=context.space_data.edit_tree.bl_rna.identifier,
+            socket_type=socket.bl_idname,
+            is_output=socket.is_output,
+        )
+        self.transition_key = get_transition_key(socket)
+        self.context = None
+        self.steps = self.iter_steps()
+
+    def iter_steps(self) -> Iterator[None]:
+        """Do the prefetching, yielding whenever it is safe to pause"""
+        data = self.data
+        prefs = get_prefs(self.context)
+
+        data.categories, data.layout = load_custom_nodes_info(self.context.space_data.tree_type, self.context)
+        data.all_nodes, data.variant_nodes = get_all_nodes(self.context, data.categories)
+        yield
+
+        if prefs.npie_link_drag_disable_invalid:
+            socket_data = get_node_socket_info(data.tree_type)
+            yield
+
+            idnames = list(dict.fromkeys(get_idname(n) for n in data.all_nodes.values()))
+            for i in range(0, len(idnames), CHUNK_SIZE):
+                for idname in idnames[i : i + CHUNK_SIZE]:
+                    item = NodeItem("", idname)
+                    data.valid_nodes[idname] = is_socket_to_node_valid(
+                        data.socket_type,
+                        data.is_output,
+                        item,
+                        socket_data,
+                    )
+                yield
+
+        node_counts = get_node_counts(data.tree_type, data.all_nodes)
+        data.node_sizes = get_node_sizes(node_counts, prefs.npie_normal_size, prefs.npie_max_size)
+        yield
+
+        if prefs.npie_suggestions or prefs.npie_size_by_suggestions:
+            data.suggestions = transition_counts.get_ranked(self.transition_key)
+            data.suggested_nodes = get_suggested_nodes(data.suggestions, data.all_nodes, data.variant_nodes)
+        data.finished = True
+
+    def run(self, context: Context, time_limit: float = STEP_TIME) -> bool:
+        """Continue prefetching until the time limit is reached. Returns True if the prefetching is finished"""
+        self.context = context
+        end_time = perf_counter() + time_limit
+        for _ in self.steps:
+            if perf_counter() > end_time:
+                break
+        self.context = None
+        return self.data.finished
+
+    def finish(self, context: Context) -> PiePrefetch:
+        """Complete any remaining prefetching immediately, and return the result"""
+        self.run(context, time_limit=float("inf"))
+        return self.data
+
+    def cancel(self):
+        self.steps.close()
@@ -1,12 +1,15 @@
 import bpy
-from bpy.props import BoolProperty, FloatProperty
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, IntProperty, StringProperty
 from bpy.types import KeyMap, KeyMapItem, UILayout
 from .npie_panels import NPIE_PT_node_info
 
 from .. import __package__ as base_package
-from .npie_btypes import BRegister
+from .npie_asset_index import asset_indexer
+from .npie_btypes import BRegister, Config, get_startup_times
+from .npie_draw_budget import draw_budget
 from .npie_helpers import get_prefs
 from .npie_keymap import get_keymap, get_operator_keymap_items
+from .npie_timings import timings
 from .npie_ui import draw_inline_prop, draw_section
 from .operators.op_call_link_drag import (
     NPIE_OT_call_link_drag,
@@ -71,6 +74,65 @@ class NodePiePrefs(bpy.types.AddonPreferences):
         description="Prevent new changes the popularity of nodes.",
     )
 
+    npie_popularity_backend: EnumProperty(
+        name="Popularity storage",
+        items=[
+            ("JSON", "JSON file", "Store the popularity of nodes in a JSON file"),
+            (
+                "SQLITE",
+                "SQLite database",
+                "Store the popularity of nodes in a database, which is safe to use from several Blender instances at once. "
+                + "Existing popularity data is imported the first time it is used",
+            ),
+        ],
+        default="JSON",
+        description="How to store the number of times each node has been added",
+    )
+
+    npie_popularity_baseline: StringProperty(
+        name="Studio baseline",
+        description="A popularity file shared by a team, that decides the size of nodes that haven't been used locally. "
+        + "Can be generated with npie_merge_popularity.py. If empty, nodes_baseline.json in the addon folder is used if it exists",
+        subtype="FILE_PATH",
+    )
+
+    npie_show_recent: BoolProperty(
+        name="Show recent nodes",
+        default=False,
+        description="Draw the nodes that were added most recently in the pie",
+    )
+
+    npie_recent_count: IntProperty(
+        name="Recent nodes",
+        default=6,
+        min=1,
+        max=32,
+        description="The number of recently added nodes to show",
+    )
+
+    def index_assets_update(self, context):
+        if self.npie_index_assets:
+            asset_indexer.start()
+        else:
+            asset_indexer.stop()
+
+    npie_index_assets: BoolProperty(
+        name="Index asset libraries",
+        default=False,
+        description="Read the node group assets in the local asset libraries in the background, \
+            so that the most popular ones can be shown in the pie".replace(
+            "  ", ""
+        ),
+        update=index_assets_update,
+    )
+
+    npie_popular_assets: IntProperty(
+        name="Popular assets",
+        default=5,
+        min=0,
+        description="The number of the most popular node group assets to show in the pie",
+    )
+
     npie_separator_headings: BoolProperty(
         name="Subcategory labels",
         default=False,
@@ -89,6 +151,17 @@ class NodePiePrefs(bpy.types.AddonPreferences):
         description="Draw icons for categories",
     )
 
+    npie_max_category_items: IntProperty(
+        name="Max category items",
+        default=0,
+        min=0,
+        description="The maximum number of nodes to draw in each category.\
+            Larger categories only show their most popular nodes, with the rest in a sub menu.\
+            Zero means no limit".replace(
+            "  ", ""
+        ),
+    )
+
     def dev_extras_update(self, context):
         if self.npie_dev_extras:
             bpy.utils.register_class(NPIE_PT_node_info)
@@ -114,6 +187,23 @@ class NodePiePrefs(bpy.types.AddonPreferences):
         description="Grey out nodes that are no able to be connected when using link drag or link insert",
     )
 
+    npie_suggestions: IntProperty(
+        name="Suggested nodes",
+        default=4,
+        min=0,
+        max=16,
+        description="The number of nodes to suggest when link dragging, \
+            based on the nodes most often added from the same kind of socket. Zero disables suggestions".replace(
+            "  ", ""
+        ),
+    )
+
+    npie_size_by_suggestions: BoolProperty(
+        name="Size by suggestions",
+        default=True,
+        description="When link dragging, draw the nodes most often added from the same kind of socket larger",
+    )
+
     def draw_debug_update(self, context):
         if self.npie_draw_debug_lines:
             register_debug_handler()
@@ -138,6 +228,33 @@ class NodePiePrefs(bpy.types.AddonPreferences):
         subtype="PIXEL",
     )
 
+    def draw_time_budget_update(self, context):
+        draw_budget.reset()
+
+    npie_draw_time_budget: FloatProperty(
+        name="Draw time budget",
+        default=25,
+        min=0,
+        description="The maximum time in milliseconds that drawing the pie should take.\
+            If it takes longer, expensive extras will be disabled until it is fast enough again.\
+            Zero means no limit".replace(
+            "  ", ""
+        ),
+        update=draw_time_budget_update,
+    )
+
+    def record_timings_update(self, context):
+        timings.enabled = self.npie_record_timings
+        if not timings.enabled:
+            timings.clear()
+
+    npie_record_timings: BoolProperty(
+        name="Record timings",
+        default=False,
+        description="Record how long the slowest parts of the addon take, to find the cause of a slow pie",
+        update=record_timings_update,
+    )
+
     # custom_node_def_directory: StringProperty(
     #     name="Custom node definition file directory.",
     #     description="A folder for user created definition files. This is used so that"
@@ -156,6 +273,14 @@ class NodePiePrefs(bpy.types.AddonPreferences):
         draw_inline_prop(col, prefs, "npie_show_variants", factor=fac)
         draw_inline_prop(col, prefs, "npie_separator_headings", factor=fac)
         draw_inline_prop(col, prefs, "npie_expand_node_groups", factor=fac)
+        draw_inline_prop(col, prefs, "npie_show_recent", factor=fac)
+        if prefs.npie_show_recent:
+            draw_inline_prop(col, prefs, "npie_recent_count", factor=fac)
+        draw_inline_prop(col, prefs, "npie_index_assets", factor=fac)
+        if prefs.npie_index_assets:
+            row = draw_inline_prop(col, prefs, "npie_popular_assets", factor=fac)
+            row.operator("node_pie.refresh_asset_index", text="", icon="FILE_REFRESH")
+        draw_inline_prop(col, prefs, "npie_max_category_items", factor=fac)
         draw_inline_prop(col, prefs, "npie_dev_extras", factor=fac)
         draw_inline_prop(col, prefs, "npie_color_size", factor=fac)
 
@@ -173,11 +298,46 @@ class NodePiePrefs(bpy.types.AddonPreferences):
             toggle=True,
         )
         row.operator("node_pie.reset_popularity", icon="FILE_REFRESH")
+        draw_inline_prop(col, prefs, "npie_popularity_backend", factor=fac)
+        draw_inline_prop(col, prefs, "npie_popularity_baseline", factor=fac)
+
+        col = draw_section(layout, "Performance")
+        draw_inline_prop(col, prefs, "npie_draw_time_budget", factor=fac)
+        col = col.column(align=True)
+        col.scale_y = 0.8
+        col.label(text=f"Last pie draw: {draw_budget.last_time * 1000:.1f}ms")
+        startup_time = sum(Config.import_times.values()) + Config.register_time
+        col.label(text=f"Addon startup: {startup_time * 1000:.1f}ms")
+        for name, import_time in get_startup_times()[:3]:
+            col.label(text=f"    {name}: {import_time * 1000:.1f}ms")
+        if draw_budget.peak_level:
+            col.label(text="Disabled to stay within the draw time budget:", icon="INFO")
+            for i, feature in enumerate(draw_budget.FEATURES[: draw_budget.peak_level]):
+                state = "disabled" if i < draw_budget.level else "re-enabled"
+                col.label(text=f"    {feature} ({state})")
+
+        col = draw_section(layout, "Timings")
+        draw_inline_prop(col, prefs, "npie_record_timings", factor=fac)
+        if prefs.npie_record_timings:
+            if stats := timings.get_stats():
+                grid = col.grid_flow(columns=5, row_major=True, even_columns=False, align=True)
+                for text in ["Span", "Count", "p50", "p95", "Max"]:
+                    grid.label(text=text)
+                for name, span in stats.items():
+                    grid.label(text=name)
+                    grid.label(text=str(span["count"]))
+                    for key in ["p50", "p95", "max"]:
+                        grid.label(text=f"{span[key] * 1000:.2f}ms")
+            else:
+                col.label(text="Use the pie to record timings", icon="INFO")
+            col.operator("node_pie.export_timings", icon="EXPORT")
 
         col = draw_section(layout, "On Link Drag")
         draw_inline_prop(col, prefs, "npie_use_link_dragging", factor=fac)
         if prefs.npie_use_link_dragging:
             draw_inline_prop(col, prefs, "npie_link_drag_disable_invalid", factor=fac)
+            draw_inline_prop(col, prefs, "npie_suggestions", factor=fac)
+            draw_inline_prop(col, prefs, "npie_size_by_suggestions", factor=fac)
             draw_inline_prop(col, prefs, "npie_draw_debug_lines", factor=fac)
             if prefs.npie_draw_debug_lines:
                 draw_inline_prop(col, prefs, "npie_socket_separation", factor=fac)
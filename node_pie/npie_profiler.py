@@ -0,0 +1,90 @@
+"""Capture a cProfile profile of a single use of the pie, so that slow pies can be diagnosed on other computers.
+Once armed, the next link drag invoke, pie call and pie draw are profiled,
+and the results are written to the cache directory."""
+
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+
+from .npie_helpers import get_cache_dir
+
+# The parts of opening the pie that are profiled, in the order they happen.
+# Link dragging is optional, as the pie can also be called directly.
+STAGES = ["call_link_drag", "call_node_pie", "draw_menu"]
+
+
+class PieProfiler:
+    def __init__(self):
+        self.armed = False
+        self.profile: "cProfile.Profile | None" = None
+        self.captured: list[str] = []
+        self.depth = 0
+
+    def arm(self):
+        # Only imported once profiling is requested, so that it doesn't slow down loading the addon
+        import cProfile
+
+        self.armed = True
+        self.profile = cProfile.Profile()
+        self.captured = []
+
+    @contextmanager
+    def capture(self, stage: str):
+        """Profile the body if the profiler is armed, and this stage hasn't been captured yet"""
+        if not self.armed or stage in self.captured:
+            yield
+            return
+
+        self.captured.append(stage)
+        # Stages can be nested, e.g. the pie is called from inside the link drag operator
+        if not self.depth:
+            self.profile.enable()
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            if not self.depth:
+                self.profile.disable()
+                # Drawing the pie is the last stage, so save even if it failed
+                if stage == STAGES[-1]:
+                    self.save()
+
+    def profiled(self, stage: str):
+        """A decorator that profiles each call of the function while the given stage is being captured"""
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.capture(stage):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def save(self) -> Path:
+        """Write the profile to a .pstats file, and a summary of the slowest functions next to it"""
+        import io
+        import pstats
+
+        self.armed = False
+        directory = get_cache_dir() / "profiles"
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"pie_{datetime.now():%Y%m%d_%H%M%S}.pstats"
+        self.profile.dump_stats(path)
+
+        stream = io.StringIO()
+        stream.write(f"Node Pie profile, captured stages: {', '.join(self.captured)}\n\n")
+        stats = pstats.Stats(self.profile, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(30)
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(15)
+        path.with_suffix(".txt").write_text(stream.getvalue())
+
+        self.profile = None
+        print(f"Node Pie: Saved profile to {path}")
+        return path
+
+
+pie_profiler = PieProfiler()
@@ -0,0 +1,10 @@
+"""Timings are only recorded when enabled in the preferences, see `core.timings`"""
+
+import bpy
+
+from .core.timings import timings
+from .npie_helpers import get_prefs
+
+
+def register():
+    timings.enabled = get_prefs(bpy.context).npie_record_timings
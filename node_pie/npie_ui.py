@@ -1,15 +1,18 @@
-import json
-import random
+import re
 import traceback
-from collections import OrderedDict
+from time import perf_counter
 from string import ascii_uppercase
 
 import bpy
 import nodeitems_utils
 from bpy.types import Context, Menu, UILayout
 
+from .core.popularity import get_popularity_id
+from .npie_asset_index import asset_indexer
+from .npie_auto_layout import get_auto_layout
 from .npie_btypes import BMenu
-from .npie_constants import IS_4_0, IS_5_0, POPULARITY_FILE
+from .npie_constants import IS_4_0, IS_5_0
+from .npie_draw_budget import draw_budget
 from .npie_helpers import NpieCache, get_prefs, inv_lerp, lerp
 from .npie_node_def_file import (
     NodeCategory,
@@ -17,7 +20,16 @@ from .npie_node_def_file import (
     NodeOperator,
     Separator,
 )
-from .npie_node_info import get_node_socket_info, is_socket_to_node_valid
+from .npie_node_groups import node_group_graph, node_group_socket_cache
+from .npie_node_info import (
+    get_node_socket_info,
+    get_socket_type_index,
+    is_socket_to_node_valid,
+    is_socket_type_valid,
+)
+from .npie_popularity import get_layered_counts, get_transition_key, recent_nodes, transition_counts
+from .npie_profiler import pie_profiler
+from .npie_timings import timings
 
 
 class DummyUI:
@@ -135,23 +147,76 @@ def get_tick_icon(enabled, show_box=False) -> str:
     return "CHECKMARK" if enabled else "BLANK1"
 
 
-def get_node_popularity_data():
-    """Load the popularity file"""
-    if not POPULARITY_FILE.exists():
-        with open(POPULARITY_FILE, "w") as f:
-            pass
-    with open(POPULARITY_FILE, "r") as f:
-        try:
-            data = json.load(f)
-        except json.decoder.JSONDecodeError:
-            data = {"node_trees": {}}
-    return data
-
-
-def get_popularity_id(node_idname, settings={}):
-    if not isinstance(settings, str):
-        settings = str(settings)
-    return node_idname + ("" if settings == "{}" else settings)
+def get_all_nodes(
+    context: Context, categories: dict[str, NodeCategory]
+) -> tuple[dict[str, NodeItem], dict[str, tuple[NodeItem, str]]]:
+    """Get all of the node items that can be drawn in the pie, indexed by their popularity id.
+    Also get the node item and label of each variant by its popularity id, so that nodes added from
+    a variants menu can be found without searching through every node."""
+    if not categories:
+        return {n.nodetype: n for n in nodeitems_utils.node_items_iter(context) if hasattr(n, "nodetype")}, {}
+
+    all_nodes = {}
+    variant_nodes = {}
+    for cat in categories.values():
+        for node in cat.nodes:
+            if isinstance(node, NodeItem):
+                name = node.idname + (str(node.settings) if node.settings else "")
+                all_nodes[name] = node
+                for variant_name, variant in node.variants.items():
+                    if variant_name != "separator":
+                        variant_id = get_popularity_id(node.idname, variant)
+                        variant_nodes.setdefault(variant_id, (node, f"{node.label} ({variant_name})"))
+    return all_nodes, variant_nodes
+
+
+def find_node_item(
+    all_nodes: dict[str, NodeItem], variant_nodes: dict[str, tuple[NodeItem, str]], popularity_id: str
+) -> tuple[NodeItem, str] | None:
+    """Get the node item that an added node came from, and the label to draw it with.
+    Nodes added from a variants menu use the label of the variant."""
+    if node_item := all_nodes.get(popularity_id):
+        return node_item, node_item.label
+    return variant_nodes.get(popularity_id)
+
+
+def get_suggested_nodes(
+    suggestions: list[tuple[str, int]],
+    all_nodes: dict[str, NodeItem],
+    variant_nodes: dict[str, tuple[NodeItem, str]],
+) -> list[tuple[NodeItem, str, str, str]]:
+    """Get the node item, label, idname and settings of each suggested node that is in the pie, in order"""
+    suggested = []
+    for node_id, _ in suggestions:
+        # Suggestions are stored by popularity id, so they can be looked up directly
+        if not (found := find_node_item(all_nodes, variant_nodes, node_id)):
+            continue
+        # The popularity id is the idname followed by the settings
+        idname = node_id.split("{", 1)[0]
+        settings = node_id[len(idname) :] or "{}"
+        suggested.append((*found, idname, settings))
+    return suggested
+
+
+def get_node_counts(tree_type: str, node_ids) -> dict[str, int]:
+    """Get the number of times each of the given nodes has been added"""
+    node_count_data = get_layered_counts(bpy.context, tree_type)
+    return {node_id: node_count_data.get(node_id, 0) for node_id in node_ids}
+
+
+def get_node_sizes(node_counts: dict[str, int], normal_size: float, max_size: float) -> dict[str, float]:
+    """Get the button size of each node, based on how used it is compared to the most used one"""
+    # Rank the nodes by their number of unique counts, so that the sizes are evenly spread out
+    counts = sorted(set(node_counts.values()) | {1})
+    ranks = {count: i for i, count in enumerate(counts)}
+    max_rank = max(len(counts) - 1, 1)
+
+    sizes = {}
+    for node_id, count in node_counts.items():
+        # lerp between the min and max sizes based on how used each node is compared to the most used one.
+        fac = inv_lerp(ranks[count], 0, max_rank)
+        sizes[node_id] = lerp(fac, normal_size, normal_size * max_size)
+    return sizes
 
 
 all_variants_menus: list[Menu] = []
@@ -202,21 +267,113 @@ def get_variants_menu(node_item: NodeItem, scale=1):
     return cls_idname
 
 
+all_overflow_menus: list[Menu] = []
+
+
+def unregister_overflow_menus():
+    """Unregister all currently registered category overflow menus."""
+    for menu in all_overflow_menus:
+        try:
+            bpy.utils.unregister_class(menu)
+        except RuntimeError:
+            pass
+    all_overflow_menus.clear()
+
+
+def get_category_max_items(category: NodeCategory, prefs) -> int:
+    """Get the maximum number of node items to draw for the given category, 0 means no limit"""
+    return category.max_items if category.max_items >= 0 else prefs.npie_max_category_items
+
+
+def is_category_oversized(category: NodeCategory, prefs) -> bool:
+    """Whether the category has more node items than can be drawn directly in the pie"""
+    max_items = get_category_max_items(category, prefs)
+    return bool(max_items) and sum(isinstance(n, NodeItem) for n in category.nodes) > max_items
+
+
+def get_overflow_menu_idname(category: NodeCategory) -> str:
+    name = re.sub(r"\W", "_", category.idname)
+    return f"NPIE_MT_{name}_more_{abs(hash(category.idname + category.label))}"
+
+
+def get_overflow_menu(category: NodeCategory) -> str:
+    """Register a sub menu that contains all of the nodes in an oversized category.
+    The node buttons are only created when the menu is opened, rather than each time the pie is drawn."""
+    cls_idname = get_overflow_menu_idname(category)
+
+    class NPIE_MT_category_overflow(Menu):
+        """A sub menu showing all nodes in a category that is too big to fully draw in the pie."""
+
+        bl_label = category.label
+        bl_idname = cls_idname
+
+        def draw(self, context):
+            layout = self.layout
+            col = layout.column(align=True)
+            show_variants = get_prefs(context).npie_show_variants
+            for node in category.nodes:
+                if hasattr(node, "poll") and not node.poll(context):
+                    continue
+                if isinstance(node, Separator):
+                    col.separator()
+                    if node.label:
+                        col.label(text=node.label)
+                elif isinstance(node, NodeOperator):
+                    op = col.operator(node.idname, text=node.label)
+                    for name, value in node.settings.items():
+                        setattr(op, name, value)
+                else:
+                    row = col.row(align=True)
+                    op = row.operator("node_pie.add_node", text=node.label)
+                    op.type = node.idname
+                    op.settings = str(node.settings)
+                    # Keep the variants reachable for the nodes that aren't drawn in the pie
+                    if node.variants and show_variants:
+                        row.menu(get_variants_menu(node), text="", icon="TRIA_RIGHT")
+
+    try:
+        bpy.utils.register_class(NPIE_MT_category_overflow)
+    except RuntimeError:
+        pass
+
+    all_overflow_menus.append(NPIE_MT_category_overflow)
+    return cls_idname
+
+
 def get_node_groups(context):
     """Get a list of node groups that can be added to the current node tree"""
 
-    # A set of the node trees that are currently being edited in this area.
+    # A set of the node trees that are currently being edited in this area,
+    # and all of the groups that contain the edited tree, however deeply nested.
     # These can't be added as that would cause recursion.
-    editing_groups = {p.node_tree for p in context.space_data.path}
+    editing_groups = {p.node_tree.name_full for p in context.space_data.path}
+    editing_groups |= node_group_graph.get_ancestors(context.space_data.edit_tree)
 
     tree_type = context.space_data.tree_type
     node_groups = []
     for ng in bpy.data.node_groups:
-        if ng.bl_idname == tree_type and ng not in editing_groups and not ng.name.startswith("."):
+        if ng.bl_idname == tree_type and ng.name_full not in editing_groups and not ng.name.startswith("."):
             node_groups.append(ng)
+
+    # Show the groups that can be connected to the dragged socket first
+    if NpieCache.from_socket:
+        node_groups.sort(key=lambda ng: not is_node_group_valid(ng))
     return node_groups
 
 
+def is_node_group_valid(node_group) -> bool:
+    """Check if the node group has any valid connections to the socket that the pie was called from,
+    and to all of the sockets it will be linked to if being inserted into a link."""
+    socket = NpieCache.from_socket
+    if not socket:
+        return True
+    socket_data = node_group_socket_cache.get_socket_info(node_group)
+    for s in [socket] + NpieCache.to_sockets:
+        if not is_socket_type_valid(s.bl_idname, s.is_output, socket_data):
+            return False
+    return True
+
+
 @BMenu("Node Groups")
 class NPIE_MT_node_groups(Menu):
     """Show a list of node groups that you can add"""
@@ -229,8 +386,12 @@ class NPIE_MT_node_groups(Menu):
 
         layout = self.layout
         col = layout.column(align=True)
+        disable_invalid = get_prefs(context).npie_link_drag_disable_invalid
         for ng in node_groups:
-            op = col.operator("node_pie.add_node", text=ng.name)
+            row = col.row(align=True)
+            if disable_invalid:
+                row.active = is_node_group_valid(ng)
+            op = row.operator("node_pie.add_node", text=ng.name)
             op.type = tree_type.replace("Tree", "Group")
             op.group_name = ng.name
 
@@ -245,8 +406,12 @@ class NPIE_MT_node_pie(Menu):
         return context.space_data.edit_tree and prefs.node_pie_enabled
 
     def draw(self, context):
+        start_time = perf_counter()
         try:
-            self.draw_menu(context)
+            with pie_profiler.capture("draw_menu"):
+                self.draw_menu(context)
+            draw_budget.record(perf_counter() - start_time, get_prefs(context).npie_draw_time_budget / 1000)
+            timings.record("draw_menu", start_time)
         except Exception as e:
             pie = self.layout.menu_pie()
             pie.row()
@@ -269,51 +434,95 @@ class NPIE_MT_node_pie(Menu):
 
         # Add a search button for each letter of the alphabet.
         # This simulates type to search present in other menus.
+        # Trees with a definition file use the node pie search, which includes variants and is ordered by popularity.
+        use_npie_search = NpieCache.categories != {}
         col = layout.column(align=True)
         col.scale_y = 0.00001
         for letter in list(ascii_uppercase):
-            op = col.operator("wm.search_single_menu", text=letter)
-            op.menu_idname = "NODE_MT_add"
-            op.initial_query = letter
+            if use_npie_search:
+                op = col.operator("node_pie.search_nodes", text=letter)
+                op.query = letter
+            else:
+                op = col.operator("wm.search_single_menu", text=letter)
+                op.menu_idname = "NODE_MT_add"
+                op.initial_query = letter
 
         pie = layout.menu_pie()
         prefs = get_prefs(context)
         tree_type = context.space_data.edit_tree.bl_rna.identifier
+        span_start = timings.start()
+
+        # Use the data computed while link dragging if it is available
+        prefetch = NpieCache.prefetch
+        if prefetch and not prefetch.matches(tree_type, NpieCache.from_socket):
+            prefetch = None
+
+        # Skip the expensive extras if previous draws have taken too long
+        disable_invalid = prefs.npie_link_drag_disable_invalid and draw_budget.use_validity
+        variable_sizes = prefs.npie_variable_sizes and draw_budget.use_variable_sizes
 
         socket_data = None
-        # sockets_file = NODE_DEF_SOCKETS / f"{tree_type}_sockets.jsonc"
-        if prefs.npie_link_drag_disable_invalid and NpieCache.from_socket:  # and sockets_file.exists():
+        socket_index = None
+        if disable_invalid and NpieCache.from_socket and NpieCache.to_sockets:
+            # When inserting into a link, nodes need to be valid for the sockets on both sides
+            socket_index = get_socket_type_index(tree_type)
+            insert_valid_nodes = socket_index.get_insert_valid_nodes(NpieCache.from_socket, NpieCache.to_sockets)
+        elif disable_invalid and NpieCache.from_socket and not prefetch:
             socket_data = get_node_socket_info(tree_type)
-            # socket_data = json.loads(sockets_file.read_text(), cls=JSONWithCommentsDecoder)
+        timings.record("draw_menu.sockets", span_start)
 
+        span_start = timings.start()
         categories, cat_layout = NpieCache.categories, NpieCache.layout
         has_node_file = categories != {}
 
-        if not has_node_file:
-            all_nodes = {n.nodetype: n for n in nodeitems_utils.node_items_iter(context) if hasattr(n, "nodetype")}
+        if prefetch:
+            all_nodes, variant_nodes = prefetch.all_nodes, prefetch.variant_nodes
         else:
-            all_nodes = {}
-            for cat in categories.values():
-                for node in cat.nodes:
-                    if isinstance(node, NodeItem):
-                        name = node.idname + (str(node.settings) if node.settings else "")
-                        all_nodes[name] = node
-
-        # Get the count of times each node has been used
-        node_count_data = get_node_popularity_data()["node_trees"].get(tree_type, {})
-        all_node_counts = {}
-        for node_name in all_nodes:
-            all_node_counts[node_name] = node_count_data.get(node_name, {}).get("count", 0)
-        all_node_counts[""] = 1
-        all_node_counts = OrderedDict(sorted(all_node_counts.items(), key=lambda item: item[1]))
+            all_nodes, variant_nodes = get_all_nodes(context, categories)
+
+        # The size of each node based on the number of times it has been used.
+        # Only computed when it is needed, as popularity sizes are one of the features disabled by the draw budget.
+        node_sizes = prefetch.node_sizes if prefetch else None
+
+        def get_popularity_sizes() -> dict[str, float]:
+            nonlocal node_sizes
+            if node_sizes is None:
+                node_counts = get_node_counts(tree_type, all_nodes)
+                node_sizes = get_node_sizes(node_counts, prefs.npie_normal_size, prefs.npie_max_size)
+            return node_sizes
+
+        # The nodes most often added after dragging a link from this kind of socket
+        suggestions = []
+        suggestion_sizes = {}
+        if prefetch:
+            suggestions = prefetch.suggestions
+        elif NpieCache.from_socket and (prefs.npie_suggestions or prefs.npie_size_by_suggestions):
+            suggestions = transition_counts.get_ranked(get_transition_key(NpieCache.from_socket))
+        if suggestions and variable_sizes and prefs.npie_size_by_suggestions:
+            max_size = prefs.npie_normal_size * prefs.npie_max_size
+            for node_id, count in suggestions:
+                suggestion_sizes[node_id] = lerp(count / suggestions[0][1], prefs.npie_normal_size, max_size)
+        timings.record("draw_menu.sizes", span_start)
+        span_start = timings.start()
 
         def get_node_size(node_item: NodeItem):
-            # lerp between the min and max sizes based on how used each node is compared to the most used one.
             identifier = get_popularity_id(node_item.idname, node_item.settings)
-            index = all_node_counts.get(identifier, 0)
-            counts = list(dict.fromkeys(all_node_counts.values()))
-            fac = inv_lerp(counts.index(index), 0, max(len(counts) - 1, 1))
-            return lerp(fac, prefs.npie_normal_size, prefs.npie_normal_size * prefs.npie_max_size)
+            size = get_popularity_sizes().get(identifier, prefs.npie_normal_size)
+            # Make the suggested nodes at least as big as their popularity from this socket
+            return max(size, suggestion_sizes.get(identifier, 0))
+
+        def is_node_valid(node_item: NodeItem):
+            """Check whether the node can be connected to the socket that the pie was called from"""
+            if socket_index:
+                return socket_index.is_node_valid(node_item.idname, insert_valid_nodes)
+            if prefetch:
+                return prefetch.valid_nodes.get(node_item.idname, True)
+            return is_socket_to_node_valid(
+                NpieCache.from_socket.bl_idname,
+                NpieCache.from_socket.is_output,
+                node_item,
+                socket_data,
+            )
 
         def get_color_prop_name(color_name: str):
             theme = context.preferences.themes[0].node_editor
@@ -354,17 +563,14 @@ class NPIE_MT_node_pie(Menu):
 
             # Draw the colour bar to the side
             split = row.split(factor=prefs.npie_color_size, align=True)
-            if socket_data and isinstance(node_item, NodeItem):
-                split.active = is_socket_to_node_valid(
-                    NpieCache.from_socket.bl_idname,
-                    NpieCache.from_socket.is_output,
-                    node_item,
-                    socket_data,
-                )
+            if disable_invalid and (socket_data or socket_index or prefetch) and isinstance(node_item, NodeItem):
+                split.active = is_node_valid(node_item)
+            elif disable_invalid and group_name:
+                split.active = is_node_group_valid(bpy.data.node_groups[group_name])
 
             scale = 1
             # draw the operator larger if the node is used more often
-            if prefs.npie_variable_sizes and not group_name and not op and split.active:
+            if variable_sizes and not group_name and not op and split.active:
                 scale = get_node_size(node_item)
             row.scale_y = scale
 
@@ -397,7 +603,7 @@ class NPIE_MT_node_pie(Menu):
                 return subrow
 
             # This is used to reduce the opacity of the background when inactive as I can't find the theme settings for that
-            if not split.active:
+            if not split.active and draw_budget.use_overlays:
                 row.operator("node_pie.add_node", text=" ")
                 row = same_row()
                 row.scale_y = scale
@@ -417,12 +623,13 @@ class NPIE_MT_node_pie(Menu):
                         op.bl_description = bpy.app.translations.pgettext_tip(nodeitem.description)
 
                 if node_item and node_item.variants and prefs.npie_show_variants:
-                    row = same_row()
-
-                    row.scale_x = 1.1
-                    row.scale_y = scale
-                    row.alignment = "RIGHT"
-                    row.active = split.active
+                    if draw_budget.use_overlays:
+                        row = same_row()
+                        row.scale_x = 1.1
+                        row.scale_y = scale
+                        row.alignment = "RIGHT"
+                        row.active = split.active
+                    # Without the overlay, draw the variants menu next to the button so that it is still reachable
                     row.menu(
                         get_variants_menu(node_item, scale=1.1),
                         text="",
@@ -484,6 +691,64 @@ class NPIE_MT_node_pie(Menu):
                 draw_operator_bg(text="Assets", icon="ASSET_MANAGER")
                 col.menu("NODE_MT_node_add_root_catalogs", text=" ")
 
+        def draw_suggestions(layout: UILayout):
+            """Draw the nodes that are added most often from the socket the link was dragged from"""
+            if not suggestions or not prefs.npie_suggestions:
+                return
+            col = layout.box().column(align=True)
+            draw_header(col, "Suggested", "LIGHT")
+            shown = 0
+            if prefetch:
+                suggested = prefetch.suggested_nodes
+            else:
+                suggested = get_suggested_nodes(suggestions, all_nodes, variant_nodes)
+            for node_item, label, idname, settings in suggested:
+                if not node_item.poll(context):
+                    continue
+                if disable_invalid and (socket_data or socket_index or prefetch) and not is_node_valid(node_item):
+                    continue
+                params = {"type": idname, "settings": settings, "use_transform": True}
+                color = get_color_name(node_item.category, node_item)
+                draw_add_operator(col, label, color, op="node_pie.add_node", params=params)
+                shown += 1
+                if shown >= prefs.npie_suggestions:
+                    break
+
+        def draw_recent(layout: UILayout):
+            """Draw the nodes that were added most recently"""
+            if not prefs.npie_show_recent:
+                return
+            recent = recent_nodes.get_recent(tree_type, prefs.npie_recent_count)
+            if not recent:
+                return
+            col = layout.box().column(align=True)
+            draw_header(col, "Recent", "TIME")
+            for idname, settings, group_name in recent:
+                params = {"type": idname, "settings": settings, "group_name": group_name, "use_transform": True}
+                if group_name:
+                    if group_name in bpy.data.node_groups:
+                        draw_add_operator(col, group_name, "group", op="node_pie.add_node", params=params, max_len=18)
+                    continue
+                if not (node_item := find_node_item(all_nodes, variant_nodes, get_popularity_id(idname, settings))):
+                    continue
+                node_item, label = node_item
+                if node_item.poll(context):
+                    color = get_color_name(node_item.category, node_item)
+                    draw_add_operator(col, label, color, op="node_pie.add_node", params=params)
+
+        def draw_popular_assets(layout: UILayout):
+            """Draw the node group assets from the asset index that are added most often"""
+            if not prefs.npie_index_assets or not prefs.npie_popular_assets:
+                return
+            assets = asset_indexer.get_popular_assets(context, tree_type, prefs.npie_popular_assets)
+            if not assets:
+                return
+            col = layout.box().column(align=True)
+            draw_header(col, "Assets")
+            for asset in assets:
+                params = {"path": asset.path, "name": asset.name}
+                draw_add_operator(col, asset.name, "group", op="node_pie.add_asset", params=params, max_len=18)
+
         def draw_category(layout: UILayout, category: NodeCategory, header="", remove: str = ""):
             """Draw all node items in this category"""
             if not category.poll(context):
@@ -499,6 +764,15 @@ class NPIE_MT_node_pie(Menu):
             if len(nodeitems) == 0:
                 return
 
+            # Only draw the most popular nodes in oversized categories, the rest can be found in a sub menu
+            oversized = is_category_oversized(category, prefs)
+            if oversized:
+                node_items = [n for n in nodeitems if isinstance(n, NodeItem)]
+                sizes = get_popularity_sizes()
+                node_items.sort(key=lambda n: sizes.get(get_popularity_id(n.idname, n.settings), 0), reverse=True)
+                shown = {id(n) for n in node_items[: get_category_max_items(category, prefs)]}
+                nodeitems = [n for n in nodeitems if isinstance(n, NodeOperator) or id(n) in shown]
+
             for i, node in enumerate(nodeitems):
                 # Draw separators
                 if isinstance(node, Separator):
@@ -527,9 +801,16 @@ class NPIE_MT_node_pie(Menu):
                     node_item=node,
                 )
 
+            if oversized:
+                row = col.row(align=True)
+                row.scale_y = prefs.npie_normal_size
+                row.menu(get_overflow_menu_idname(category), text="More", icon="THREE_DOTS")
+
         def draw_search(layout: UILayout):
             layout.scale_y = prefs.npie_normal_size
-            if IS_4_0:
+            if use_npie_search:
+                layout.operator("node_pie.search_nodes", text="Search", icon="VIEWZOOM")
+            elif IS_4_0:
                 layout.operator("wm.search_single_menu", text="Search", icon="VIEWZOOM").menu_idname = "NODE_MT_add"
             else:
                 layout.operator("node.add_search", text="Search", icon="VIEWZOOM").use_transform = True
@@ -553,21 +834,24 @@ class NPIE_MT_node_pie(Menu):
             draw_area(cat_layout["left"], add_search_dummies=True)
             draw_area(cat_layout["right"])
             col = pie.column()
+            draw_suggestions(col)
             if tree_type in {"GeometryNodeTree", "ShaderNodeTree", "CompositorNodeTree"}:
                 draw_node_groups(col)
+                draw_popular_assets(col)
+            draw_recent(col)
             col = draw_area(cat_layout["bottom"], col)
             col = draw_area(cat_layout["top"])
             draw_search(col.box())
 
         else:
             # Automatically draw all node items as space efficiently as possible.
+            # Node trees without a definition file normally get a generated one, so this only runs for the shader
+            # editor with a third party render engine, or when no nodes could be found to generate a file from.
 
-            # Get all categories for the current context, and sort them based on the number of nodes they contain.
-            categories = list(nodeitems_utils.node_categories_iter(context))
-            categories.sort(key=lambda cat: len(list(cat.items(context))))
-            # categories.sort(key=lambda cat: sum(get_node_size(n.nodetype) for n in cat.items(context) if hasattr(n, "nodetype")))
+            # Get all categories for the current context, and the items in each of them.
+            all_categories = list(nodeitems_utils.node_categories_iter(context))
 
-            if not categories:
+            if not all_categories:
                 pie.separator()
                 pie.separator()
                 box = pie.box().column(align=True)
@@ -584,110 +868,28 @@ class NPIE_MT_node_pie(Menu):
                 return
 
             # Remove the layout category, all of it's entries can be accessed with shortcuts
-            for i, cat in enumerate(categories[:]):
-                if cat.name == "Layout":
-                    categories.pop(i)
-
-            # Pick two categories from the middle of the list, and draw them in the top and bottom of the pie.
-            # From the middle so that they aren't too big and aren't too small.
-            areas = [[], [], [], []]
-            areas[2] = [categories.pop(len(categories) // 2)]
-            areas[3] = [categories.pop(len(categories) // 2 - 1)]
-
-            # The structure of areas is:
-            # [left, right, top, bottom]
-            # where each item can be:
-            # [[small_category, small_category], big_category]
-            # and each sublist is equivalent to a column in the pie.
-
-            def add_categories(orig_cats: list, i: int, max_height: int):
-                """
-                Add the given categories to the given area.
-                The categories are packed according to their height relative to the provided max size.
-                """
-
-                for j, cat in enumerate(orig_cats):
-                    idx = categories.index(cat)
-
-                    # If first category, add it and continue
-                    if j == 0:
-                        areas[i].append(categories.pop(idx))
-                        continue
+            categories = {cat.identifier: cat for cat in all_categories if cat.name != "Layout"}
+            category_items = {idname: list(cat.items(context)) for idname, cat in categories.items()}
 
-                    size = len(list(cat.items(context)))
-                    columns = areas[i]
-
-                    # Loop over all columns and if current category fits in one, add it, else create a new column
-                    for column in columns:
-                        # Get the length of all items in the column
-                        prev_items = column
-                        if not isinstance(prev_items, list):
-                            prev_items = [column]
-                        prev_item_size = sum(len(list(c.items(context))) for c in prev_items)
-
-                        # Add an extra item to account for the heading of each category
-                        prev_item_size += len(prev_items)
-
-                        # Decide whether to add the category to the current column or a new one
-                        if prev_item_size + size < max_height:
-                            areas[i][areas[i].index(column)] = prev_items + [categories.pop(idx)]
-                            break
-                    else:
-                        areas[i].append(categories.pop(idx))
-
-                if i:
-                    areas[i] = areas[i][::-1]
-
-            # Add half the categories
-            big_on_inside = True
-            biggest = len(list(categories[-1].items(context)))
-            orig_cats = categories.copy()
-            add_categories(orig_cats[:: 2 * -1 if big_on_inside else 1], 0, biggest)
-
-            # Add the other half, which is now just the rest of them
-            # biggest = len(list(categories[-1].items(context)))
-            orig_cats = categories.copy()
-            add_categories(orig_cats[:: 1 * -1 if big_on_inside else 1], 1, biggest)
-            orig_colors = [
-                "converter",
-                "color",
-                # "distor",
-                "input",
-                "output",
-                "filter",
-                "vector",
-                "texture",
-                "shader",
-                # "script",
-                "geometry",
-                "attribute",
-            ]
-            new_colors = orig_colors.copy()
-            random.seed(tree_type)
+            # Only pack the categories if they have changed since the last draw
+            sizes = {idname: len(items) for idname, items in category_items.items()}
+            auto_layout = get_auto_layout(tree_type, sizes)
 
             # Draw all of the areas
-            for i, area in enumerate(areas):
+            for i, area in enumerate(auto_layout.areas):
                 row = pie.row()
-                # Use this to control whether the big nodes are at the center or at the edges
-                area = area[::-1]
                 # Draw the columns inside the area
                 for node_cats in area:
                     # Add the parent column
                     bigcol = row.column(align=False)
 
-                    if not isinstance(node_cats, list):
-                        node_cats = [node_cats]
-
                     # Draw all of the categories in this column
-                    for node_cat in node_cats:
+                    for cat_idname in node_cats:
                         col = bigcol.box().column(align=True)
-                        # color = random.choice(colors)
-                        if not new_colors:
-                            new_colors = orig_colors.copy()
-                        color = new_colors.pop(random.randint(0, len(new_colors) - 1))
-                        draw_header(col, node_cat.name)
+                        color = auto_layout.colors[cat_idname]
+                        draw_header(col, categories[cat_idname].name)
 
-                        for nodeitem in node_cat.items(context):
+                        for nodeitem in category_items[cat_idname]:
                             if not hasattr(nodeitem, "nodetype") or not hasattr(nodeitem, "label"):
                                 col.separator(factor=0.4)
                                 continue
@@ -703,6 +905,8 @@ class NPIE_MT_node_pie(Menu):
                         draw_search(bigcol.box())
                         bigcol.separator(factor=0.4)
 
+        timings.record("draw_menu.layout", span_start)
+
 
 # def draw_add_menu_dummy(self, context):
 #     layout: UILayout = self.layout
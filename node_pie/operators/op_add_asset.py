@@ -0,0 +1,55 @@
+import sqlite3
+
+import bpy
+
+from ..core.assets import get_asset_popularity_id
+from ..npie_btypes import BOperator
+from ..npie_helpers import get_prefs
+from ..npie_popularity import get_popularity_store
+
+# The custom property used to find node groups that have already been appended from an asset
+ASSET_PROP = "npie_asset"
+
+
+@BOperator("node_pie", label="Add asset", undo=True)
+class NPIE_OT_add_asset(BOperator.type):
+    """Add a node group asset from an asset library, and increase its popularity by 1"""
+
+    path: bpy.props.StringProperty(name="Path", description="The .blend file containing the asset")
+    name: bpy.props.StringProperty(name="Name", description="The name of the node group asset")
+
+    def execute(self, context):
+        asset_id = get_asset_popularity_id(self.path, self.name)
+
+        # Reuse the node group if it has already been appended
+        node_group = next((ng for ng in bpy.data.node_groups if ng.get(ASSET_PROP) == asset_id), None)
+        if not node_group:
+            try:
+                with bpy.data.libraries.load(self.path, assets_only=True) as (data_from, data_to):
+                    if self.name in data_from.node_groups:
+                        data_to.node_groups = [self.name]
+            except OSError as e:
+                self.report({"ERROR"}, str(e))
+                return {"CANCELLED"}
+
+            if not data_to.node_groups:
+                self.report({"ERROR"}, f"Asset '{self.name}' not found in {self.path}, it may have been moved")
+                return {"CANCELLED"}
+            node_group = data_to.node_groups[0]
+            node_group[ASSET_PROP] = asset_id
+
+        tree_type = context.space_data.edit_tree.bl_rna.identifier
+        bpy.ops.node_pie.add_node(
+            "INVOKE_DEFAULT",
+            type=tree_type.replace("Tree", "Group"),
+            group_name=node_group.name,
+            use_transform=True,
+        )
+
+        if not get_prefs(context).npie_freeze_popularity:
+            try:
+                get_popularity_store(context).increment(tree_type, asset_id)
+            except (ValueError, sqlite3.Error) as e:
+                # The asset has already been added, so only the popularity is lost
+                self.report({"ERROR"}, f"Could not update the asset popularity: {e}")
+        return {"FINISHED"}
@@ -1,20 +1,24 @@
 import ast
-import json
-from typing import OrderedDict
+import sqlite3
 
 import bpy
 from bpy.types import Node, NodeSocket, NodeTree
 
 from ..npie_btypes import BOperator
-from ..npie_constants import IS_4_2, POPULARITY_FILE, POPULARITY_FILE_VERSION
-from ..npie_helpers import NpieCache
+from ..npie_constants import IS_4_2
+from ..npie_helpers import NpieCache, get_prefs
+from ..npie_node_groups import node_group_graph
 from ..npie_node_info import (
     ALL_TYPES,
     CAPTURE_ATTRIBUTE_SOCKETS,
     COMPARE_TYPES,
-    EXCLUSIVE_SOCKETS,
     SWITCH_TYPES,
+    get_node_data_types,
+    get_socket_compatibility,
+    get_socket_family,
 )
+from ..npie_popularity import get_popularity_store, get_transition_key, recent_nodes, transition_counts
+from ..npie_timings import timings
 from ..npie_ui import get_popularity_id
 
 
@@ -34,21 +38,33 @@ def set_node_settings(socket: NodeSocket, node: Node, ui: bool = True):
     if node.bl_idname == "GeometryNodeSwitch" and not (
         socket.bl_idname.startswith("NodeSocketBool") and ui and socket.is_output
     ):
-        try:
-            name = next(s for s in SWITCH_TYPES if socket.bl_idname.startswith(s))
-        except StopIteration:
+        if not (name := get_socket_family(socket.bl_idname, SWITCH_TYPES)):
             return
         node.input_type = SWITCH_TYPES[name]
 
     elif node.bl_idname == "FunctionNodeCompare" and socket.is_output:
-        try:
-            name = next(s for s in COMPARE_TYPES if socket.bl_idname.startswith(s))
-        except StopIteration:
+        if not (name := get_socket_family(socket.bl_idname, COMPARE_TYPES)):
             return
         node.data_type = COMPARE_TYPES[name]
 
     elif hasattr(node, "data_type"):
-        name = next(s for s in ALL_TYPES if socket.bl_idname.startswith(s))
+        if not (name := get_socket_family(socket.bl_idname, ALL_TYPES)):
+            return
+        # Use the last supported data type, as the attribute types (e.g. FLOAT_VECTOR) come after the basic ones
+        data_types = get_node_data_types(node)
+        if data_types:
+            for data_type in reversed(ALL_TYPES[name]):
+                if data_type not in data_types:
+                    continue
+                # The items of some nodes are filtered for each instance, so a type in the class items can still fail
+                try:
+                    node.data_type = data_type
+                    break
+                except TypeError:
+                    pass
+            return
+
+        # Fall back to trying each type for nodes with dynamic data types
         for data_type in ALL_TYPES[name]:
             try:
                 node.data_type = data_type
@@ -64,20 +80,17 @@ def get_socket(from_socket, to_sockets):
     if not to_sockets:
         return
 
-    socket = None
-    for s in to_sockets:
-        if s.bl_idname != from_socket.bl_idname:
-            if s.bl_idname in EXCLUSIVE_SOCKETS or from_socket.bl_idname in EXCLUSIVE_SOCKETS:
-                continue
-        socket = s
-        break
-    if not socket:
-        socket = to_sockets[0]
-    return socket
+    # Pick the socket with the best matching type, preferring earlier sockets if they are equally good
+    scores = [get_socket_compatibility(from_socket.bl_idname, s.bl_idname) for s in to_sockets]
+    best_score = max(scores)
+    if not best_score:
+        return to_sockets[0]
+    return to_sockets[scores.index(best_score)]
 
 
-def handle_node_linking(socket: NodeSocket, node: Node):
-    """Make the optimal link between a node and a socket, taking into account socket types"""
+def handle_node_linking(socket: NodeSocket, node: Node) -> bool:
+    """Make the optimal link between a node and a socket, taking into account socket types.
+    Returns whether a link was made."""
 
     if socket.is_output:
         inputs = [s for s in node.inputs if s.enabled and not s.hide]
@@ -90,6 +103,20 @@ def handle_node_linking(socket: NodeSocket, node: Node):
 
     if from_socket and to_socket:
         node.id_data.links.new(from_socket, to_socket)
+        return True
+    return False
+
+
+def get_pie_socket(node_tree: NodeTree) -> NodeSocket | None:
+    """Get the socket that the pie was called from, as long as it is still in the given node tree"""
+    socket = NpieCache.from_socket
+    try:
+        if socket and socket.id_data == node_tree:
+            return socket
+    except ReferenceError:
+        # The socket has been removed since the pie was called
+        pass
+    return None
 
 
 @BOperator("node_pie", idname="add_node", undo=True)
@@ -123,10 +150,13 @@ class NPIE_OT_add_node(BOperator.type):
         node = node_tree.nodes.active
         if self.group_name:
             node.node_tree = bpy.data.node_groups[self.group_name]
+            # The node tree being edited now contains the group, which changes which groups can be added to it
+            node_group_graph.tag_dirty()
 
         # If being added by dragging from a socket
-        if socket := NpieCache.from_socket:
-            set_node_settings(socket, node)
+        from_socket = get_pie_socket(node_tree)
+        if from_socket:
+            set_node_settings(from_socket, node)
 
         # Set the settings for the node
         settings = ast.literal_eval(self.settings)
@@ -158,45 +188,34 @@ class NPIE_OT_add_node(BOperator.type):
             setattr(attr, name, value)
 
         # If being added by dragging from a socket
-        if socket := NpieCache.from_socket:
-            handle_node_linking(socket, node)
+        linked = False
+        if from_socket:
+            linked = handle_node_linking(from_socket, node)
 
         # If being added by dragging from a socket
-        if sockets := NpieCache.to_sockets:
+        if from_socket and (sockets := NpieCache.to_sockets):
             for socket in sockets:
                 handle_node_linking(socket, node)
 
-        with open(POPULARITY_FILE, "r") as f:
-            if text := f.read():
-                try:
-                    data = json.loads(text)
-                except json.decoder.JSONDecodeError:
-                    data = {}
-            else:
-                data = {}
-
-        version = data.get("version", POPULARITY_FILE_VERSION)
+        # The sockets only apply to the pie they were set for, so don't link to them from any later additions
+        NpieCache.from_socket = None
+        NpieCache.to_sockets = []
 
-        if version[0] > POPULARITY_FILE_VERSION[0]:
-            self.report({"ERROR"}, "Saved nodes file is from a newer version of the addon")
-            return {"CANCELLED"}
+        try:
+            recent_nodes.add(node_tree.bl_rna.identifier, self.type, self.settings, self.group_name)
+        except OSError as e:
+            # The node has already been added, so only the recent nodes are lost
+            self.report({"ERROR"}, f"Could not update the recent nodes: {e}")
 
-        trees = data.get("node_trees", {})
-        nodes = OrderedDict(trees.get(node_tree.bl_rna.identifier, {}))
-        key = get_popularity_id(self.type, self.settings)
-        node = nodes.get(key, {})
-        count = node.get("count", 0)
-        count += 1
-
-        data["version"] = POPULARITY_FILE_VERSION
-        node["count"] = count
-        nodes[key] = node
-        # Sort the nodes in descending order
-        nodes = OrderedDict(sorted(nodes.items(), key=lambda item: item[1].get("count", 0), reverse=True))
-        trees[node_tree.bl_rna.identifier] = nodes
-        data["node_trees"] = trees
-
-        with open(POPULARITY_FILE, "w") as f:
-            json.dump(data, f, indent=4)
+        if not get_prefs(context).npie_freeze_popularity:
+            try:
+                with timings.span("add_node.popularity"):
+                    popularity_id = get_popularity_id(self.type, self.settings)
+                    get_popularity_store(context).increment(node_tree.bl_rna.identifier, popularity_id)
+                    if linked:
+                        transition_counts.add(get_transition_key(from_socket), popularity_id)
+            except (ValueError, sqlite3.Error, OSError) as e:
+                # The node has already been added, so only the popularity is lost
+                self.report({"ERROR"}, f"Could not update the node popularity: {e}")
 
         return {"PASS_THROUGH"}
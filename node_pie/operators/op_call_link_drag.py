@@ -1,3 +1,4 @@
+import traceback
 from itertools import chain
 
 import bpy
@@ -11,8 +12,10 @@ from ..socket_location import get_socket_location
 
 from ..npie_btypes import BOperator
 from ..npie_constants import IS_4_0, IS_4_5
-from ..npie_drawing import draw_line
 from ..npie_helpers import NpieCache, Rectangle, get_node_location, get_prefs
+from ..npie_prefetch import LinkDragPrefetcher
+from ..npie_profiler import pie_profiler
+from ..npie_timings import timings
 
 location = None
 hitbox_size = 10  # The radius in which to register a socket click
@@ -256,16 +259,11 @@ def get_socket_bboxes(positions: dict[NodeSocket, V]) -> tuple[dict[NodeSocket,
     return bboxes
 
 
-if IS_4_0:
-    shader: gpu.types.GPUShader = gpu.shader.from_builtin("UNIFORM_COLOR")
-else:
-    shader: gpu.types.GPUShader = gpu.shader.from_builtin("2D_UNIFORM_COLOR")
-
-
 def draw_debug_lines():
     """Draw a circle around the sockets of the active node, and also the last location that the node pie was activated"""
     node = bpy.context.active_node
     if node:
+        shader: gpu.types.GPUShader = gpu.shader.from_builtin("UNIFORM_COLOR" if IS_4_0 else "2D_UNIFORM_COLOR")
         positions = get_socket_positions(node)
         bboxes = get_socket_bboxes(positions)
         for socket, bbox in bboxes.items():
@@ -322,26 +320,31 @@ class NPIE_OT_call_link_drag(BOperator.type):
             return False
         return True
 
+    @pie_profiler.profiled("call_link_drag")
     def invoke(self, context: Context, event: Event):
         self.handler = None
         self.socket = None
         self.from_pos = V((0, 0))
         self.released = False
+        self.prefetcher = None
+        self.timer = None
+        NpieCache.prefetch = None
 
         mouse_pos = region_to_view(context.area, self.mouse_region)
         global location
         location = mouse_pos
         # Look for a socket near to the mouse position
-        for node in context.space_data.edit_tree.nodes:
-            if node.hide:
-                continue
-            positions = get_socket_positions(node)
-            bboxes = get_socket_bboxes(positions)
-            for socket, bbox in bboxes.items():
-                if bbox.isinside(mouse_pos) and socket.bl_idname != "NodeSocketVirtual":
-                    self.socket = socket
-                    self.from_pos = view_to_region(context.area, positions[socket])
-                    break
+        with timings.span("call_link_drag.hit_test"):
+            for node in context.space_data.edit_tree.nodes:
+                if node.hide:
+                    continue
+                positions = get_socket_positions(node)
+                bboxes = get_socket_bboxes(positions)
+                for socket, bbox in bboxes.items():
+                    if bbox.isinside(mouse_pos) and socket.bl_idname != "NodeSocketVirtual":
+                        self.socket = socket
+                        self.from_pos = view_to_region(context.area, positions[socket])
+                        break
 
         # if socket clicked
         if not self.pass_through and self.socket and get_prefs(context).npie_use_link_dragging:
@@ -353,6 +356,10 @@ class NPIE_OT_call_link_drag(BOperator.type):
                 "POST_PIXEL",
             )
             handlers.append(self.handler)
+
+            # Start computing the data needed to draw the pie while the user is still dragging
+            self.prefetcher = LinkDragPrefetcher(context, self.socket)
+            self.timer = context.window_manager.event_timer_add(0.01, window=context.window)
             return self.start_modal()
         else:
             NpieCache.from_socket = self.socket
@@ -360,27 +367,58 @@ class NPIE_OT_call_link_drag(BOperator.type):
             bpy.ops.node_pie.call_node_pie("INVOKE_DEFAULT")
         return self.FINISHED
 
-    def finish(self):
+    def remove_timer(self, context: Context):
+        if self.timer:
+            context.window_manager.event_timer_remove(self.timer)
+            self.timer = None
+
+    def finish(self, context: Context):
+        self.remove_timer(context)
         bpy.types.SpaceNodeEditor.draw_handler_remove(self.handler, "WINDOW")
         global handlers
         handlers.remove(self.handler)
         return self.FINISHED
 
+    def prefetch_failed(self, context: Context, error: Exception):
+        """Clean up if prefetching fails, e.g. because of an invalid definition file"""
+        traceback.print_exc()
+        self.prefetcher.cancel()
+        self.finish(context)
+        self.report({"ERROR"}, f"Node pie: {error}")
+        return self.CANCELLED
+
     def modal(self, context: Context, event: Event):
+        if event.type == "TIMER":
+            # Do a small chunk of the prefetching, without blocking the ui
+            try:
+                if self.timer and self.prefetcher.run(context):
+                    self.remove_timer(context)
+            except Exception as e:
+                return self.prefetch_failed(context, e)
+            return self.RUNNING_MODAL
+
         context.area.tag_redraw()
 
         if event.type in {"RIGHTMOUSE", "ESC"} and event.value != "RELEASE":
-            return self.finish()
+            self.prefetcher.cancel()
+            return self.finish(context)
 
         elif event.value == "RELEASE" and event.type not in {"CTRL", "ALT", "OSKEY", "SHIFT"}:
             NpieCache.from_socket = self.socket
             NpieCache.to_sockets = []
+            try:
+                NpieCache.prefetch = self.prefetcher.finish(context)
+            except Exception as e:
+                return self.prefetch_failed(context, e)
             bpy.ops.node_pie.call_node_pie("INVOKE_DEFAULT", reset_args=False)
-            return self.finish()
+            return self.finish(context)
 
         return self.RUNNING_MODAL
 
     def draw_handler(self, context: Context):
+        # Imported here so that the drawing module is only loaded once it's needed
+        from ..npie_drawing import draw_line
+
         to_pos = self.mouse_region
         color = self.socket.draw_color(context, self.socket.node)
         draw_line(self.from_pos, to_pos, color)
@@ -1,9 +1,17 @@
 import bpy
-from ..npie_helpers import NpieCache
+from ..npie_helpers import NpieCache, get_prefs
 
 from ..npie_btypes import BOperator
 from ..npie_node_def_file import NodeItem, load_custom_nodes_info
-from ..npie_ui import NPIE_MT_node_pie, get_variants_menu, unregister_variants_menus
+from ..npie_profiler import pie_profiler
+from ..npie_ui import (
+    NPIE_MT_node_pie,
+    get_overflow_menu,
+    get_variants_menu,
+    is_category_oversized,
+    unregister_overflow_menus,
+    unregister_variants_menus,
+)
 
 
 @BOperator("node_pie")
@@ -18,21 +26,35 @@ class NPIE_OT_call_node_pie(BOperator.type):
             return False
         return True
 
+    @pie_profiler.profiled("call_node_pie")
     def execute(self, context):
         unregister_variants_menus()
+        unregister_overflow_menus()
 
-        # The variants menus can't be registered in a draw function, so add them here beforehand
-        categories, cat_layout = load_custom_nodes_info(context.area.spaces.active.tree_type, context)
+        # Use the definitions loaded while link dragging if possible
+        prefetch = NpieCache.prefetch
+        tree_type = context.space_data.edit_tree.bl_rna.identifier if context.space_data.edit_tree else ""
+        if not self.reset_args and prefetch and prefetch.matches(tree_type, NpieCache.from_socket):
+            categories, cat_layout = prefetch.categories, prefetch.layout
+            NpieCache.categories, NpieCache.layout = categories, cat_layout
+        else:
+            categories, cat_layout = load_custom_nodes_info(context.area.spaces.active.tree_type, context)
 
+        # The variants menus can't be registered in a draw function, so add them here beforehand
         has_node_file = categories != {}
         if has_node_file:
+            prefs = get_prefs(context)
             for cat_name, category in categories.items():
                 for node in category.nodes:
                     if isinstance(node, NodeItem) and node.variants:
                         get_variants_menu(node)
+                for sub_category in [category] + (category.children or []):
+                    if is_category_oversized(sub_category, prefs):
+                        get_overflow_menu(sub_category)
 
         if self.reset_args:
             NpieCache.from_socket = None
-            NpieCache.to_socket = []
+            NpieCache.to_sockets = []
+            NpieCache.prefetch = None
 
         bpy.ops.wm.call_menu_pie("INVOKE_DEFAULT", name=NPIE_MT_node_pie.__name__)
@@ -1,101 +1,40 @@
-from inspect import isclass
-
-import bpy
 from bpy.types import NodeTree
 
 from ..npie_btypes import BOperator
-from ..npie_helpers import get_all_node_types
-from ..npie_node_def_file import Separator, load_custom_nodes_info
 from .op_call_link_drag import region_to_view
 
-EXCLUDED_NODES = {
-    "FunctionNodeAlignEulerToVector",
-    "FunctionNodeRotateEuler",
-    "GeometryNodeRepeatInput",
-    "GeometryNodeForeachGeometryElementInput",
-    "GeometryNodeForeachGeometryElementOutput",
-    "GeometryNodeSimulationOutput",
-    "GeometryNodeSimulationInput",
-    "GeometryNodeRepeatOutput",
-    "GeometryNodeViewer",
-    "GeometryNodeGroup",
-    "NodeClosureInput",
-    "NodeClosureOutput",
-    "NodeGroupInput",
-    "NodeGroupOutput",
-    "ShaderNodeOutputLineStyle",
-    "ShaderNodeOutputWorld",
-    "ShaderNodeGroup",
-    "CompositorNodeGroup",
-    "CompositorNode",
-    "CompositorNodeCurveRGB",
-    "ShaderNode",
-    "GeometryNode",
-}
-
 
 @BOperator(label="Check for missing nodes")
 class NPIE_OT_check_missing_nodes(BOperator.type):
     """Check for any nodes that aren't included in the node pie for this node tree type, and add them to the tree."""
 
     def execute(self, context):
-        node_tree: NodeTree = context.space_data.edit_tree
+        # Only imported when needed, as checking for missing nodes is rarely done, see the lazy modules in configure()
+        from ..npie_node_availability import get_missing_nodes_report
 
-        # Get a list of nodes already in the pie menu
-        categories, cat_layout = load_custom_nodes_info(context.area.spaces.active.tree_type, context)
-        nodes: set[str] = set()
-        for cat in categories.values():
-            for node in cat.nodes:
-                if isinstance(node, Separator):
-                    continue
-                nodes.add(node.idname)
+        node_tree: NodeTree = context.space_data.edit_tree
+        report = get_missing_nodes_report(context, context.area.spaces.active.tree_type, node_tree)
 
-        # Get a list of node types for this node tree
-        bpy_nodes: set[str] = set()
-        for bpy_type in dir(bpy.types):
-            bpy_type = getattr(bpy.types, bpy_type)
-            if not isclass(bpy_type) or not issubclass(bpy_type, bpy.types.Node):
-                continue
-            identifier = bpy_type.bl_rna.identifier
-            if identifier in EXCLUDED_NODES:
-                continue
-            if "legacy" in bpy_type.bl_rna.name.lower():
-                if identifier in nodes:
-                    print("LEGACY: ", identifier)
-                continue
+        # Add missing nodes
+        added = []
+        skipped = []
+        position = region_to_view(context.area, self.mouse_region)
+        for node_type in report["missing"]:
             try:
-                node = node_tree.nodes.new(identifier)
+                node = node_tree.nodes.new(node_type)
             except RuntimeError:
+                skipped.append(node_type)
                 continue
-            node_tree.nodes.remove(node)
-            bpy_nodes.add(identifier)
-
-        # Add missing nodes
-        print("Missing nodes:")
-        bl_node_types = get_all_node_types()
-        unused_nodes = bpy_nodes - nodes
-
-        def sort_node(idname: str):
-            bl_node = bl_node_types.get(idname)
-            if bl_node:
-                label = bl_node.bl_rna.name if bl_node.bl_rna.name != "Node" else bl_node.bl_label
-            else:
-                label = ""
-                print("haha", idname)
-            return label
-
-        # unused_nodes = sorted(unused_nodes, key=sort_node)
-        unused_nodes = sorted(unused_nodes)
-        position = region_to_view(context.area, self.mouse_region)
-        for node_type in unused_nodes:
-            node = node_tree.nodes.new(node_type)
             node.location = position
             position.x += node.width + 20
-            print(node_type)
-
-        extra_nodes = sorted(nodes - bpy_nodes)
-        if not extra_nodes:
-            return
-        print("UNUSED NODES:")
-        for node_type in extra_nodes:
-            print(node_type)
+            added.append(node_type)
+
+        if added:
+            self.report({"INFO"}, f"Missing nodes: {', '.join(added)}")
+        if skipped:
+            self.report({"WARNING"}, f"Could not add missing nodes: {', '.join(skipped)}")
+        if report["unused"]:
+            self.report({"WARNING"}, f"Unused nodes: {', '.join(report['unused'])}")
+        if not added and not skipped and not report["unused"]:
+            self.report({"INFO"}, "No missing nodes found")
+        return self.FINISHED
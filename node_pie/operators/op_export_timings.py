@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from bpy.props import StringProperty
+
+from ..npie_btypes import BOperator
+from ..npie_timings import timings
+
+
+@BOperator("node_pie", label="Export timings")
+class NPIE_OT_export_timings(BOperator.type):
+    """Export all of the recorded timings as a JSON lines file, so that they can be compared between computers"""
+
+    filepath: StringProperty(subtype="FILE_PATH", default="node_pie_timings.jsonl")
+    filter_glob: StringProperty(default="*.jsonl", options={"HIDDEN"})
+
+    @classmethod
+    def poll(cls, context):
+        return bool(timings.spans)
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return self.RUNNING_MODAL
+
+    def execute(self, context):
+        path = Path(self.filepath)
+        timings.export(path)
+        self.report({"INFO"}, f"Exported {len(timings.spans)} timings to {path}")
+        return self.FINISHED
@@ -45,6 +45,7 @@ class NPIE_OT_insert_node_pie(BOperator.type):
                 # Call the node pie
                 NpieCache.from_socket = from_socket
                 NpieCache.to_sockets = to_sockets
+                NpieCache.prefetch = None
                 bpy.ops.node_pie.call_node_pie("INVOKE_DEFAULT", reset_args=False)
 
             self.cursor.reset_icon()
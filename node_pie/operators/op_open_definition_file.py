@@ -1,7 +1,7 @@
 from bpy.props import BoolProperty
 from ..npie_btypes import BOperator
 from ..npie_constants import NODE_DEF_BASE_FILE, NODE_DEF_DIR, NODE_DEF_EXAMPLE_FILE
-from ..npie_helpers import get_all_def_files
+from ..npie_def_file_index import get_all_def_files
 
 import shutil
 import webbrowser
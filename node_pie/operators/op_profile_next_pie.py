@@ -0,0 +1,12 @@
+from ..npie_btypes import BOperator
+from ..npie_helpers import get_cache_dir
+from ..npie_profiler import pie_profiler
+
+
+@BOperator("node_pie", label="Profile next pie")
+class NPIE_OT_profile_next_pie(BOperator.type):
+    """Profile the next time the pie is opened, and save the results to a file that can be sent to the developers"""
+
+    def execute(self, context):
+        pie_profiler.arm()
+        self.report({"INFO"}, f"The next pie will be profiled, and saved to {get_cache_dir() / 'profiles'}")
@@ -0,0 +1,11 @@
+from ..npie_asset_index import asset_indexer
+from ..npie_btypes import BOperator
+
+
+@BOperator("node_pie", label="Refresh asset index")
+class NPIE_OT_refresh_asset_index(BOperator.type):
+    """Read any node group assets that have been added or changed in the asset libraries since they were last indexed"""
+
+    def execute(self, context):
+        asset_indexer.start()
+        self.report({"INFO"}, "Updating the asset index in the background")
@@ -1,6 +1,6 @@
 from bpy.types import UILayout
 from ..npie_btypes import BOperator
-from ..npie_constants import POPULARITY_FILE
+from ..npie_popularity import get_popularity_store, recent_nodes, transition_counts
 
 
 @BOperator("node_pie")
@@ -30,7 +30,8 @@ class NPIE_OT_reset_popularity(BOperator.type):
         row.label(text="Continue anyway?")
 
     def execute(self, context):
-        with open(POPULARITY_FILE, "w"):
-            pass
+        get_popularity_store(context).reset()
+        transition_counts.reset()
+        recent_nodes.reset()
         self.report({"INFO"}, "Node popularity successfully reset")
         return {"FINISHED"}
\ No newline at end of file
@@ -0,0 +1,100 @@
+import bpy
+from bpy.types import UILayout
+
+from ..core.search import SearchEntry, SearchIndex, search
+from ..npie_asset_index import asset_indexer
+from ..npie_btypes import BOperator
+from ..npie_helpers import get_prefs
+from ..npie_node_def_file import NodeItem, get_search_index
+from ..npie_popularity import get_layered_counts
+from ..npie_ui import get_node_groups
+
+
+class SearchState:
+    """The indices and popularity for the search popup that is currently open.
+    These are gathered once when it is opened, so that each keystroke only needs to look up the query."""
+
+    indices: list[SearchIndex] = []
+    popularity: dict[str, float] = {}
+    # The ids of the node items that are hidden in the current context
+    hidden: set[int] = set()
+
+
+def is_entry_shown(entry: SearchEntry) -> bool:
+    return id(entry.item) not in SearchState.hidden
+
+
+def search_items(self, context, edit_text: str):
+    """Called by blender on every keystroke to get the results"""
+    results = search(SearchState.indices, edit_text, SearchState.popularity, filter=is_entry_shown)
+    return [(entry.label, entry.description) for entry in results]
+
+
+@BOperator("node_pie", label="Search nodes")
+class NPIE_OT_search_nodes(BOperator.type):
+    """Search for a node, node variant, node group or asset to add, with the most popular matches first"""
+
+    query: bpy.props.StringProperty(
+        name="Search",
+        search=search_items,
+        search_options={"SUGGESTION"},
+        options={"SKIP_SAVE"},
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return context.space_data and context.area.type == "NODE_EDITOR" and context.space_data.edit_tree
+
+    def invoke(self, context, event):
+        tree_type = context.space_data.tree_type
+        SearchState.indices = []
+        SearchState.hidden = set()
+        if index := get_search_index(tree_type):
+            SearchState.indices.append(index)
+            items = {id(e.item): e.item for e in index.entries if isinstance(e.item, NodeItem)}
+            SearchState.hidden = {i for i, item in items.items() if not item.poll(context)}
+
+        # Node groups change too often to be part of the definition index, but there are few enough to index here
+        group_type = tree_type.replace("Tree", "Group")
+        groups = [SearchEntry(f"{ng.name} (Group)", group_type, group_name=ng.name) for ng in get_node_groups(context)]
+        if groups:
+            SearchState.indices.append(SearchIndex(groups))
+
+        if get_prefs(context).npie_index_assets:
+            SearchState.indices.append(asset_indexer.get_search_index(context.space_data.edit_tree.bl_rna.identifier))
+
+        SearchState.popularity = get_layered_counts(context, context.space_data.edit_tree.bl_rna.identifier)
+        return context.window_manager.invoke_props_dialog(self)
+
+    def draw(self, context):
+        layout: UILayout = self.layout
+        layout.activate_init = True
+        layout.prop(self, "query", text="", icon="VIEWZOOM")
+
+    def execute(self, context):
+        entry = None
+        for index in SearchState.indices:
+            if entry := index.get_entry(self.query):
+                break
+        else:
+            # Use the best match if the query wasn't chosen from the results
+            if results := search(SearchState.indices, self.query, SearchState.popularity, is_entry_shown, limit=1):
+                entry = results[0]
+
+        if not entry:
+            self.report({"WARNING"}, f"No nodes found for '{self.query}'")
+            return {"CANCELLED"}
+
+        if entry.is_operator:
+            category, name = entry.idname.split(".")
+            getattr(getattr(bpy.ops, category), name)("INVOKE_DEFAULT", **entry.settings)
+            return {"FINISHED"}
+
+        bpy.ops.node_pie.add_node(
+            "INVOKE_DEFAULT",
+            type=entry.idname,
+            group_name=entry.group_name,
+            settings=str(entry.settings),
+            use_transform=True,
+        )
+        return {"FINISHED"}